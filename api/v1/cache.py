@@ -0,0 +1,160 @@
+#!/usr/bin/python3
+"""Response cache and conditional GET support for the API
+
+A cached view keeps the JSON bytes of its last 200 response for each
+path and query string, along with the storage generation of the classes
+it reads. While storage.generation() of those classes is unchanged the
+bytes are sent again without touching the objects.
+
+HBNB_API_CACHE=0 turns the cache off, and it is off by default with the
+database storage, whose generations only see the writes of this process.
+HBNB_API_CACHE_SIZE bounds the number of responses kept (default 1024)
+and HBNB_API_CACHE_BYTES the bytes of their bodies (default 64 MiB), the
+oldest responses being dropped first. Only the query parameters the
+views read are part of the key, so that others cannot fill the cache.
+
+conditional_jsonify() gives the responses of model objects a strong ETag
+and a Last-Modified header computed from the objects themselves, and
+answers 304 Not Modified without serializing them when they match.
+"""
+from datetime import timezone
+from flask import jsonify, make_response, request
+from functools import wraps
+import hashlib
+import models
+from models import storage
+from os import getenv
+import threading
+
+enabled = getenv("HBNB_API_CACHE",
+                 "0" if models.storage_t == "db" else "1") == "1"
+size = int(getenv("HBNB_API_CACHE_SIZE", "1024"))
+budget = int(getenv("HBNB_API_CACHE_BYTES", str(64 * 1024 * 1024)))
+# the query parameters read by the views, in the order of the keys
+params = ("cursor", "k", "lat", "limit", "lng", "q", "radius")
+# (path, parameters) -> (generations, JSON bytes, ETag, headers)
+responses = {}
+# bytes of the bodies in responses
+held = 0
+# the headers of a response kept along with its body
+kept = ("ETag", "Last-Modified", "Link", "X-Next-Cursor")
+metrics = {"hits": 0, "misses": 0}
+lock = threading.Lock()
+
+
+def not_modified(etag, last_modified=None):
+    """tells if the client already holds the response with these
+    validators, If-None-Match taking precedence over If-Modified-Since"""
+    if request.if_none_match:
+        return etag is not None and request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def conditional_jsonify(data):
+    """returns jsonify() of the to_dict() of data, a model object or a
+    list of them, or 304 Not Modified when the client holds it already
+
+    The ETag hashes the class, id and updated_at of the objects, so it
+    is known before anything is serialized. If-Modified-Since is only
+    honoured for a single object, as removing one from a list does not
+    move the latest updated_at.
+    """
+    objs = data if isinstance(data, list) else [data]
+    digest = hashlib.sha1()
+    last_modified = None
+    for obj in objs:
+        updated_at = obj.updated_at
+        digest.update("{}.{}.{}\n".format(obj.__class__.__name__, obj.id,
+                                          updated_at).encode())
+        if last_modified is None or updated_at > last_modified:
+            last_modified = updated_at
+    etag = digest.hexdigest()
+    if last_modified is not None:
+        last_modified = last_modified.replace(microsecond=0,
+                                              tzinfo=timezone.utc)
+    if not_modified(etag, None if objs is data else last_modified):
+        response = make_response("", 304)
+    elif objs is data:
+        response = jsonify([obj.to_dict() for obj in objs])
+    else:
+        response = jsonify(data.to_dict())
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    return response
+
+
+def conditional(response):
+    """gives response an ETag hashing its body and turns it into a 304
+    Not Modified when the client holds it already"""
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+def store(key, entry):
+    """keeps entry under key, dropping the oldest responses to stay
+    within the size and budget; called with the lock held"""
+    global held
+    old = responses.pop(key, None)
+    if old is not None:
+        held -= len(old[1])
+    length = len(entry[1])
+    if size <= 0 or length > budget:
+        return
+    while responses and (len(responses) >= size or
+                         held + length > budget):
+        held -= len(responses.pop(next(iter(responses)))[1])
+    responses[key] = entry
+    held += length
+
+
+def cached(*classes):
+    """caches the responses of a view until storage touches classes"""
+    def decorator(view):
+        """wraps view"""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            """returns the cached response of view, or caches a new one"""
+            if not enabled:
+                return view(*args, **kwargs)
+            key = (request.path, tuple((name, request.args[name])
+                                       for name in params
+                                       if name in request.args))
+            # read before running the view so that a write racing with it
+            # leaves an entry that is already outdated
+            generations = tuple(storage.generation(cls) for cls in classes)
+            entry = responses.get(key)
+            if entry is not None and entry[0] == generations:
+                with lock:
+                    metrics["hits"] += 1
+                generations, body, etag, headers = entry
+                if not_modified(etag):
+                    response = make_response("", 304)
+                else:
+                    response = make_response(body)
+                    response.mimetype = "application/json"
+                response.headers.extend(headers)
+                response.headers["X-Cache"] = "HIT"
+                return response
+            response = make_response(view(*args, **kwargs))
+            with lock:
+                metrics["misses"] += 1
+                if response.status_code == 200 and \
+                   not response.is_streamed:
+                    store(key, (generations, response.get_data(),
+                                response.get_etag()[0],
+                                [(name, response.headers[name])
+                                 for name in kept
+                                 if name in response.headers]))
+            response.headers["X-Cache"] = "MISS"
+            return response
+        return wrapper
+    return decorator
+
+
+def stats():
+    """returns the hit and miss counters, the number of responses and
+    the bytes of their bodies"""
+    with lock:
+        return dict(metrics, entries=len(responses), bytes=held)
@@ -0,0 +1,54 @@
+#!/usr/bin/python3
+"""Pagination of the API collection endpoints
+
+A collection is always paged, a request without a limit parameter
+getting pages of HBNB_API_PAGE_SIZE objects (default 100). A page holds
+at most limit objects (HBNB_API_MAX_LIMIT caps it, default 1000) in id
+order. When more follow, the response has a Link header with rel="next"
+and an X-Next-Cursor header; passing that cursor back returns the
+objects after it. HBNB_API_PAGE_SIZE=0 only pages the requests with a
+limit or a cursor, the others getting the whole collection.
+"""
+from api.v1.cache import conditional_jsonify
+from flask import abort, request, url_for
+from models import storage
+from os import getenv
+
+page_size = int(getenv("HBNB_API_PAGE_SIZE", "100"))
+max_limit = int(getenv("HBNB_API_MAX_LIMIT", "1000"))
+
+
+def limit_arg(default=None):
+    """returns the limit parameter of the request, capped at max_limit,
+    or default if it has none"""
+    limit = request.args.get("limit")
+    if limit is None:
+        return default
+    try:
+        limit = int(limit)
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        abort(400, description="limit must be a positive integer")
+    return min(limit, max_limit)
+
+
+def paged(cls, attr=None, value=None):
+    """returns the response for the requested page of cls objects, only
+    those whose attr is value if given, or None if no page is requested
+    """
+    limit = limit_arg()
+    cursor = request.args.get("cursor")
+    if limit is None and cursor is None and not page_size:
+        return None
+    if limit is None:
+        limit = min(page_size or max_limit, max_limit)
+    objs = storage.page(cls, limit + 1, cursor, attr, value)
+    response = conditional_jsonify(objs[:limit])
+    if len(objs) > limit:
+        cursor = objs[limit - 1].id
+        args = dict(request.view_args, limit=limit, cursor=cursor)
+        response.headers["Link"] = '<{}>; rel="next"'.format(
+            url_for(request.endpoint, **args))
+        response.headers["X-Next-Cursor"] = cursor
+    return response
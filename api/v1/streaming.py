@@ -0,0 +1,64 @@
+#!/usr/bin/python3
+"""Streamed JSON responses for large collections
+
+A collection of more than HBNB_API_STREAM_THRESHOLD objects (default
+5000, 0 never streams) is sent as a JSON array written a chunk of
+HBNB_API_STREAM_CHUNK objects (default 500) at a time, from objects
+storage.iterate() hands out one by one. Neither the list of objects nor
+their dictionaries nor the whole body are held at once, so the first
+bytes leave early and memory stays flat however large the collection.
+
+Streamed responses carry no ETag and are not cached, since both would
+need the whole body. The collection endpoints are paged unless
+HBNB_API_PAGE_SIZE is 0, so they only stream then; the search results
+of /places_search are not paged.
+"""
+from api.v1.cache import conditional_jsonify
+from flask import current_app, stream_with_context
+from itertools import islice
+from models import storage
+from os import getenv
+
+threshold = int(getenv("HBNB_API_STREAM_THRESHOLD", "5000"))
+chunk = max(1, int(getenv("HBNB_API_STREAM_CHUNK", "500")))
+
+
+def chunks(objs):
+    """yields the JSON array of the to_dict() of objs piece by piece"""
+    dumps = current_app.json.dumps
+    objs = iter(objs)
+    separator = "["
+    while True:
+        batch = [obj.to_dict() for obj in islice(objs, chunk)]
+        if not batch:
+            break
+        yield separator + dumps(batch, separators=(",", ":"))[1:-1]
+        separator = ","
+    yield "[]\n" if separator == "[" else "]\n"
+
+
+def stream_jsonify(objs):
+    """returns a response streaming the JSON array of the objects
+    iterated from objs
+
+    The request context is kept until the last chunk is written, so
+    storage is only closed by the teardown once the iteration is over.
+    """
+    return current_app.response_class(stream_with_context(chunks(objs)),
+                                      mimetype=current_app.json.mimetype)
+
+
+def listing(objs):
+    """returns the response listing objs, streamed if they are many"""
+    objs = list(objs)
+    if threshold and len(objs) > threshold:
+        return stream_jsonify(objs)
+    return conditional_jsonify(objs)
+
+
+def collection(cls):
+    """returns the response listing every cls object, streamed from
+    storage.iterate() when there are more than the threshold"""
+    if threshold and storage.count(cls) > threshold:
+        return stream_jsonify(storage.iterate(cls))
+    return conditional_jsonify(list(storage.all(cls).values()))
@@ -1,6 +1,9 @@
 #!/usr/bin/python3
 """ Amenity view """
 
+from api.v1.cache import cached, conditional_jsonify
+from api.v1.paging import paged
+from api.v1.streaming import collection
 from api.v1.views import app_views
 from flask import jsonify, abort, request
 from models import storage
@@ -8,12 +11,13 @@ from models.amenity import Amenity
 
 
 @app_views.route('/amenities', methods=['GET'], strict_slashes=False)
+@cached(Amenity)
 def get_amenities():
     """Retrieves the list of all Amenity objects"""
-    amenities = [
-        amenity.to_dict() for amenity in storage.all(Amenity).values()
-    ]
-    return jsonify(amenities)
+    response = paged(Amenity)
+    if response is None:
+        response = collection(Amenity)
+    return response
 
 
 @app_views.route(
@@ -25,7 +29,7 @@ def get_amenity(amenity_id):
     if amenity is None:
         abort(404)
 
-    return jsonify(amenity.to_dict())
+    return conditional_jsonify(amenity)
 
 
 @app_views.route(
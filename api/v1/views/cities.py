@@ -1,6 +1,8 @@
 #!/usr/bin/python3
 """ City view """
 
+from api.v1.cache import cached, conditional_jsonify
+from api.v1.paging import paged
 from api.v1.views import app_views
 from flask import jsonify, abort, request
 from models import storage
@@ -11,14 +13,17 @@ from models.city import City
 @app_views.route(
         '/states/<state_id>/cities', methods=['GET'], strict_slashes=False
     )
+@cached(State, City)
 def get_cities(state_id):
     """Retrieves the list of all City objects of a State"""
     state = storage.get(State, state_id)
     if state is None:
         abort(404)
 
-    cities = [city.to_dict() for city in state.cities]
-    return jsonify(cities)
+    response = paged(City, "state_id", state_id)
+    if response is None:
+        response = conditional_jsonify(state.cities)
+    return response
 
 
 @app_views.route(
@@ -30,7 +35,7 @@ def get_city(city_id):
     if city is None:
         abort(404)
 
-    return jsonify(city.to_dict())
+    return conditional_jsonify(city)
 
 
 @app_views.route(
@@ -1,5 +1,6 @@
 #!/usr/bin/python3
 """Index View For Flask"""
+from api.v1 import cache
 from api.v1.views import app_views
 from flask import jsonify
 from models import storage
@@ -9,11 +10,12 @@ from models import storage
 @app_views.route('/status', methods=['GET'], strict_slashes=False)
 def get_status():
     """Get status Method"""
-    return jsonify({"status": "OK"})
+    return cache.conditional(jsonify({"status": "OK"}))
 
 
 # Create a route /stats that retrieves the count of each object type
 @app_views.route('/stats', methods=['GET'], strict_slashes=False)
+@cache.cached("Amenity", "City", "Place", "Review", "State", "User")
 def get_stats():
     stats = {
         "amenities": storage.count("Amenity"),
@@ -23,4 +25,18 @@ def get_stats():
         "states": storage.count("State"),
         "users": storage.count("User")
     }
-    return jsonify(stats)
+    return cache.conditional(jsonify(stats))
+
+
+# Create a route /cache that returns the response cache counters
+@app_views.route('/cache', methods=['GET'], strict_slashes=False)
+def get_cache_stats():
+    """Get the hits, misses and entries of the response cache"""
+    return jsonify(cache.stats())
+
+
+# Create a route /pool that returns the database connection pool metrics
+@app_views.route('/pool', methods=['GET'], strict_slashes=False)
+def get_pool_stats():
+    """Get the connections of the pool and its checkout counters"""
+    return jsonify(storage.pool_stats())
@@ -1,6 +1,9 @@
 #!/usr/bin/python3
 """ Place view """
 
+from api.v1.cache import cached, conditional_jsonify
+from api.v1.paging import limit_arg, max_limit, paged
+from api.v1.streaming import collection, listing
 from api.v1.views import app_views
 from flask import jsonify, abort, request
 from models import storage
@@ -10,18 +13,24 @@ from models.user import User
 from models.amenity import Amenity
 from models.state import State
 
+# the numeric attributes places_search takes {"min": x, "max": y} for
+ranged = ('number_rooms', 'number_bathrooms', 'max_guest', 'price_by_night')
+
 
 @app_views.route(
         '/cities/<city_id>/places', methods=['GET'], strict_slashes=False
     )
+@cached(City, Place)
 def get_places(city_id):
     """Retrieves the list of all Place objects of a City"""
     city = storage.get(City, city_id)
     if city is None:
         abort(404)
 
-    places = [place.to_dict() for place in city.places]
-    return jsonify(places)
+    response = paged(Place, "city_id", city_id)
+    if response is None:
+        response = conditional_jsonify(city.places)
+    return response
 
 
 @app_views.route('/places/<place_id>', methods=['GET'], strict_slashes=False)
@@ -31,7 +40,7 @@ def get_place(place_id):
     if place is None:
         abort(404)
 
-    return jsonify(place.to_dict())
+    return conditional_jsonify(place)
 
 
 @app_views.route(
@@ -114,27 +123,79 @@ def places_search():
     except Exception as e:
         abort(400, description="Not a JSON")
 
-    if not search_params or all(len(v) == 0 for v in search_params.values()):
-        places = storage.all(Place).values()
-        return jsonify([place.to_dict() for place in places])
-
-    places = set()
-
-    # Search by states
-    if 'states' in search_params:
-        states = storage.get(State, search_params['states'])
-        for state in states:
-            places.update(state.places)
-
-    # Search by cities
-    if 'cities' in search_params:
-        cities = storage.get(City, search_params['cities'])
-        places.update(cities.places)
-
-    # Search by amenities
-    if 'amenities' in search_params:
-        amenities = storage.get(Amenity, search_params['amenities'])
-        for amenity in amenities:
-            places.intersection_update(amenity.places)
+    if search_params is None:
+        search_params = {}
+    if type(search_params) is not dict:
+        abort(400, description="Not a JSON")
 
-    return jsonify([place.to_dict() for place in places])
+    criteria = {}
+    for name in ('states', 'cities', 'amenities'):
+        ids = search_params.get(name) or []
+        if type(ids) is not list or \
+           not all(type(id) is str for id in ids):
+            abort(400, description="{} must be a list of ids".format(name))
+        criteria[name] = ids
+
+    criteria['ranges'] = {}
+    for name in ranged:
+        bounds = search_params.get(name)
+        if bounds is None:
+            continue
+        if type(bounds) is not dict or set(bounds) - {'min', 'max'} or \
+           not all(type(bounds[bound]) in (int, float) for bound in bounds):
+            abort(400, description="{} must be an object of min and max "
+                  "numbers".format(name))
+        criteria['ranges'][name] = (bounds.get('min'), bounds.get('max'))
+
+    if not any(criteria.values()):
+        return collection(Place)
+
+    return listing(storage.search_places(**criteria))
+
+
+@app_views.route('/places_nearby', methods=['GET'], strict_slashes=False)
+@cached(Place)
+def places_nearby():
+    """Retrieves the places within radius km of lat and lng, or the k
+    nearest to them, nearest first"""
+    try:
+        lat = float(request.args['lat'])
+        lng = float(request.args['lng'])
+    except (KeyError, ValueError):
+        abort(400, description="lat and lng must be numbers")
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        abort(400, description="lat and lng must be numbers")
+
+    radius = request.args.get('radius')
+    k = request.args.get('k')
+    if radius is None and k is None:
+        abort(400, description="Missing radius or k")
+    if radius is not None:
+        try:
+            radius = float(radius)
+        except ValueError:
+            radius = 0
+        if not radius > 0:
+            abort(400, description="radius must be a positive number")
+    if k is not None:
+        try:
+            k = int(k)
+        except ValueError:
+            k = 0
+        if k < 1:
+            abort(400, description="k must be a positive integer")
+        k = min(k, max_limit)
+
+    return listing(storage.places_nearby(lat, lng, radius, k))
+
+
+@app_views.route('/places/search', methods=['GET'], strict_slashes=False)
+@cached(Place)
+def search_places_text():
+    """Retrieves the places whose name or description hold words of q,
+    best match first"""
+    query = request.args.get('q', '')
+    if not query.strip():
+        abort(400, description="Missing q")
+
+    return listing(storage.search_text(Place, query, limit_arg()))
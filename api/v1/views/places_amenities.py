@@ -1,6 +1,7 @@
 #!/usr/bin/python3
 """ Places Amenities view """
 
+from api.v1.cache import cached, conditional_jsonify
 from api.v1.views import app_views
 from flask import jsonify, abort, request
 from models import storage
@@ -11,14 +12,14 @@ from models.amenity import Amenity
 @app_views.route(
         '/places/<place_id>/amenities', methods=['GET'], strict_slashes=False
     )
+@cached(Place, Amenity)
 def get_place_amenities(place_id):
     """Retrieves the list of all Amenity objects of a Place"""
     place = storage.get(Place, place_id)
     if place is None:
         abort(404)
 
-    amenities = [amenity.to_dict() for amenity in place.amenities]
-    return jsonify(amenities)
+    return conditional_jsonify(place.amenities)
 
 
 @app_views.route(
@@ -38,12 +39,16 @@ def delete_place_amenity(place_id, amenity_id):
 
     if storage.__class__.__name__ == "DBStorage":
         place.amenities.remove(amenity)
+        storage.save()
     else:
         if amenity_id not in place.amenity_ids:
             abort(404)
-        place.amenity_ids.remove(amenity_id)
+        place.amenity_ids = [
+            a_id for a_id in place.amenity_ids if a_id != amenity_id
+        ]
+        # save() moves updated_at, which the ETag of the place hashes
+        place.save()
 
-    storage.save()
     return jsonify({}), 200
 
 
@@ -64,8 +69,9 @@ def link_place_amenity(place_id, amenity_id):
 
     if storage.__class__.__name__ == "DBStorage":
         place.amenities.append(amenity)
+        storage.save()
     else:
-        place.amenity_ids.append(amenity_id)
+        place.amenity_ids = place.amenity_ids + [amenity_id]
+        place.save()
 
-    storage.save()
     return jsonify(amenity.to_dict()), 201
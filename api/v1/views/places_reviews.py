@@ -1,6 +1,9 @@
 #!/usr/bin/python3
 """ Review view """
 
+from api.v1.cache import cached, conditional_jsonify
+from api.v1.paging import limit_arg, paged
+from api.v1.streaming import listing
 from api.v1.views import app_views
 from flask import jsonify, abort, request
 from models import storage
@@ -12,14 +15,17 @@ from models.place import Place
 @app_views.route(
         '/places/<place_id>/reviews', methods=['GET'], strict_slashes=False
     )
+@cached(Place, Review)
 def get_reviews(place_id):
     """Retrieves the list of all Review objects of a Place"""
     place = storage.get(Place, place_id)
     if place is None:
         abort(404)
 
-    reviews = [review.to_dict() for review in place.reviews]
-    return jsonify(reviews)
+    response = paged(Review, "place_id", place_id)
+    if response is None:
+        response = conditional_jsonify(place.reviews)
+    return response
 
 
 @app_views.route(
@@ -31,7 +37,7 @@ def get_review(review_id):
     if review is None:
         abort(404)
 
-    return jsonify(review.to_dict())
+    return conditional_jsonify(review)
 
 
 @app_views.route(
@@ -106,3 +112,15 @@ def update_review(review_id):
 
     review.save()
     return jsonify(review.to_dict()), 200
+
+
+@app_views.route('/reviews/search', methods=['GET'], strict_slashes=False)
+@cached(Review)
+def search_reviews():
+    """Retrieves the reviews whose text holds words of q, best match
+    first"""
+    query = request.args.get('q', '')
+    if not query.strip():
+        abort(400, description="Missing q")
+
+    return listing(storage.search_text(Review, query, limit_arg()))
@@ -1,16 +1,22 @@
 #!/usr/bin/python3
 """Flask State Module"""
 from flask import Flask, jsonify, request, abort
+from api.v1.cache import cached, conditional_jsonify
+from api.v1.paging import paged
+from api.v1.streaming import collection
 from api.v1.views import app_views
 from models import storage
 from models.state import State
 
 
 @app_views.route('/states', methods=['GET'], strict_slashes=False)
+@cached(State)
 def get_states():
     """get all states"""
-    states = [state.to_dict() for state in storage.all(State).values()]
-    return jsonify(states)
+    response = paged(State)
+    if response is None:
+        response = collection(State)
+    return response
 
 
 @app_views.route('/states/<state_id>', methods=['GET'], strict_slashes=False)
@@ -19,7 +25,7 @@ def get_state(state_id):
     state = storage.get(State, state_id)
     if state is None:
         abort(404)
-    return jsonify(state.to_dict())
+    return conditional_jsonify(state)
 
 
 @app_views.route(
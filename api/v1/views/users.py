@@ -1,6 +1,9 @@
 #!/usr/bin/python3
 """ User view """
 
+from api.v1.cache import cached, conditional_jsonify
+from api.v1.paging import paged
+from api.v1.streaming import collection
 from api.v1.views import app_views
 from flask import jsonify, abort, request
 from models import storage
@@ -8,10 +11,13 @@ from models.user import User
 
 
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
+@cached(User)
 def get_users():
     """Retrieves the list of all User objects"""
-    users = [user.to_dict() for user in storage.all(User).values()]
-    return jsonify(users)
+    response = paged(User)
+    if response is None:
+        response = collection(User)
+    return response
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
@@ -21,7 +27,7 @@ def get_user(user_id):
     if user is None:
         abort(404)
 
-    return jsonify(user.to_dict())
+    return conditional_jsonify(user)
 
 
 @app_views.route('/users/<user_id>', methods=['DELETE'], strict_slashes=False)
@@ -7,6 +7,9 @@ from os import getenv
 
 
 storage_t = getenv("HBNB_TYPE_STORAGE")
+# "sqlite" is the database storage on an embedded SQLite file
+if storage_t == "sqlite":
+    storage_t = "db"
 
 if storage_t == "db":
     from models.engine.db_storage import DBStorage
@@ -5,6 +5,7 @@ Contains class BaseModel
 
 from datetime import datetime
 import models
+from operator import attrgetter
 from os import getenv
 import sqlalchemy
 from sqlalchemy import Column, String, DateTime
@@ -12,6 +13,7 @@ from sqlalchemy.ext.declarative import declarative_base
 import uuid
 
 time = "%Y-%m-%dT%H:%M:%S.%f"
+isoformat = datetime.isoformat
 
 if models.storage_t == "db":
     Base = declarative_base()
@@ -33,11 +35,11 @@ class BaseModel:
                 if key != "__class__":
                     setattr(self, key, value)
             if kwargs.get("created_at", None) and type(self.created_at) is str:
-                self.created_at = datetime.strptime(kwargs["created_at"], time)
+                self.created_at = datetime.fromisoformat(kwargs["created_at"])
             else:
                 self.created_at = datetime.utcnow()
             if kwargs.get("updated_at", None) and type(self.updated_at) is str:
-                self.updated_at = datetime.strptime(kwargs["updated_at"], time)
+                self.updated_at = datetime.fromisoformat(kwargs["updated_at"])
             else:
                 self.updated_at = datetime.utcnow()
             if kwargs.get("id", None) is None:
@@ -47,6 +49,24 @@ class BaseModel:
             self.created_at = datetime.utcnow()
             self.updated_at = self.created_at
 
+    if models.storage_t != "db":
+        # the attributes FileStorage indexes, set by it per class
+        _watched = frozenset()
+
+        def __setattr__(self, name, value):
+            """sets an attribute, letting the storage re-index the object
+            when it is one of the indexed ones"""
+            object.__setattr__(self, name, value)
+            if name in self._watched:
+                models.storage.changed(self, name)
+
+        def __delattr__(self, name):
+            """deletes an attribute, letting the storage re-index the
+            object when it is one of the indexed ones"""
+            object.__delattr__(self, name)
+            if name in self._watched:
+                models.storage.changed(self, name)
+
     def __str__(self):
         """String representation of the BaseModel class"""
         return "[{:s}] ({:s}) {}".format(self.__class__.__name__, self.id,
@@ -60,19 +80,223 @@ class BaseModel:
 
     def to_dict(self, use_pwd=False):
         """returns a dictionary containing all keys/values of the instance"""
-        new_dict = self.__dict__.copy()
-        if "created_at" in new_dict:
-            new_dict["created_at"] = new_dict["created_at"].strftime(time)
-        if "updated_at" in new_dict:
-            new_dict["updated_at"] = new_dict["updated_at"].strftime(time)
-        new_dict["__class__"] = self.__class__.__name__
-        if "_sa_instance_state" in new_dict:
-            del new_dict["_sa_instance_state"]
-        # Exclude the password key when use_pwd is False
-        if not use_pwd and "password" in new_dict:
-            del new_dict["password"]
-        return new_dict
+        return serialize(self, self.__dict__.copy(), use_pwd)
 
     def delete(self):
         """delete the current instance from the storage"""
         models.storage.delete(self)
+
+
+def serialize(obj, new_dict, use_pwd=False):
+    """turns new_dict, a copy of the attributes of obj, into the
+    dictionary to_dict() returns
+
+    isoformat() writes the same string as strftime(time) for the naive
+    datetimes the models hold, several times faster, and a timestamp
+    shared by created_at and updated_at is only formatted once.
+    """
+    if "created_at" in new_dict:
+        created_at = new_dict["created_at"]
+        new_dict["created_at"] = isoformat(created_at, "T", "microseconds")
+    else:
+        created_at = None
+    if "updated_at" in new_dict:
+        updated_at = new_dict["updated_at"]
+        if updated_at is created_at:
+            new_dict["updated_at"] = new_dict["created_at"]
+        else:
+            new_dict["updated_at"] = isoformat(updated_at, "T",
+                                               "microseconds")
+    new_dict["__class__"] = type(obj).__name__
+    new_dict.pop("_sa_instance_state", None)
+    mapper = getattr(type(obj), "__mapper__", None)
+    if mapper is not None:
+        # related objects a loader put in __dict__ are not attributes
+        for name in mapper.relationships.keys():
+            new_dict.pop(name, None)
+    # Exclude the password key when use_pwd is False
+    if not use_pwd:
+        new_dict.pop("password", None)
+    return new_dict
+
+
+class Attributes(dict):
+    """The __dict__ of a compact object: a copy of its attributes, which
+    refuses writes since they would not reach the object"""
+
+    def refuse(self, *args, **kwargs):
+        """raises TypeError, the attributes being set with setattr()"""
+        raise TypeError("the __dict__ of a compact object is read-only, "
+                        "use setattr()")
+
+    __setitem__ = __delitem__ = __ior__ = refuse
+    clear = pop = popitem = setdefault = update = refuse
+
+
+class Compact:
+    """Mixin keeping the schema attributes of a model in __slots__
+
+    With HBNB_FILE_SLOTTED=1, FileStorage builds the objects it loads
+    from compact variants of the models so that millions of them do not
+    each carry a __dict__. The variant is a subclass of the model with
+    the same name, whose qualified name is the one of the model prefixed
+    with "Compact"; attributes outside the schema are kept in a
+    dictionary of their own and __dict__ is rebuilt on demand, so
+    to_dict(), __str__(), save() and delete() behave as on any other
+    instance. That __dict__ is a read-only copy, and the objects pickle
+    as their attributes and model, so they load back as compact objects
+    of the same variant.
+
+    Each object points to the plan of the schema attributes it has set,
+    shared by every object of the class with the same ones, so that
+    reading them all back is a single attrgetter call.
+    """
+    __slots__ = ()
+    schema = frozenset()
+    fields = ()
+    defaults = {}
+    setters = {}
+    plans = {}
+    variants = {}
+    model = None
+
+    @staticmethod
+    def variant(model):
+        """returns the compact subclass of model, created on first use"""
+        compact = Compact.variants.get(model)
+        if compact is None:
+            defaults = {}
+            for klass in reversed(model.__mro__):
+                for name, value in vars(klass).items():
+                    if not name.startswith("_") and \
+                       not hasattr(value, "__get__"):
+                        defaults[name] = value
+            fields = ("id", "created_at", "updated_at") + tuple(defaults)
+            compact = type(model.__name__, (Compact, model), {
+                "__slots__": fields + ("_Compact__extra", "_Compact__plan"),
+                "__dict__": property(Compact.snapshot),
+                "__module__": model.__module__,
+                "__qualname__": "Compact" + model.__qualname__,
+                "__doc__": model.__doc__,
+                "schema": frozenset(fields),
+                "fields": fields,
+                "defaults": defaults,
+                "plans": {},
+                "model": model,
+            })
+            compact.setters = {name: vars(compact)[name].__set__
+                               for name in fields}
+            Compact.variants[model] = compact
+        return compact
+
+    @classmethod
+    def plan(cls, unset):
+        """returns the plan of the objects whose unset schema attributes
+        are the frozenset unset: their names and a getter of their values
+        """
+        plan = cls.plans.get(unset)
+        if plan is None:
+            names = tuple(name for name in cls.fields if name not in unset)
+            # the two private slots are always set and keep attrgetter
+            # returning a tuple; zip() leaves their values out
+            plan = (unset, names, attrgetter(*names, "_Compact__extra",
+                                             "_Compact__plan"))
+            cls.plans[unset] = plan
+        return plan
+
+    @classmethod
+    def build(cls, attrs):
+        """returns an instance holding the attrs of a to_dict() dictionary
+
+        Unlike __init__, the values are kept as they are: nothing is
+        parsed and no id is generated.
+        """
+        obj = object.__new__(cls)
+        setters = cls.setters
+        extra = None
+        for name, value in attrs.items():
+            setter = setters.get(name)
+            if setter is not None:
+                setter(obj, value)
+            elif name != "__class__":
+                if extra is None:
+                    extra = {}
+                extra[name] = value
+        unset = cls.schema.difference(attrs)
+        object.__setattr__(obj, "_Compact__extra", extra)
+        object.__setattr__(obj, "_Compact__plan", cls.plan(unset))
+        return obj
+
+    def __new__(cls, *args, **kwargs):
+        """returns an instance with no attribute set yet"""
+        obj = object.__new__(cls)
+        object.__setattr__(obj, "_Compact__extra", None)
+        object.__setattr__(obj, "_Compact__plan", cls.plan(cls.schema))
+        return obj
+
+    def attributes(self):
+        """returns the dictionary of the instance attributes"""
+        unset, names, values = self.__plan
+        attrs = dict(zip(names, values(self)))
+        if self.__extra:
+            attrs.update(self.__extra)
+        return attrs
+
+    def snapshot(self):
+        """returns a read-only copy of the instance attributes"""
+        return Attributes(self.attributes())
+
+    @staticmethod
+    def rebuild(model, attrs):
+        """returns the compact instance of model holding attrs"""
+        return Compact.variant(model).build(attrs)
+
+    def __reduce__(self):
+        """pickles the instance as its model and attributes"""
+        return (Compact.rebuild, (type(self).model, self.attributes()))
+
+    def to_dict(self, use_pwd=False):
+        """returns a dictionary containing all keys/values of the instance"""
+        return serialize(self, self.attributes(), use_pwd)
+
+    def __getattr__(self, name):
+        """returns an attribute outside the schema, or the model default
+        of a schema attribute that was never set"""
+        if not name.startswith("_Compact__"):
+            if self.__extra and name in self.__extra:
+                return self.__extra[name]
+            if name in type(self).defaults:
+                return type(self).defaults[name]
+        raise AttributeError("'{}' object has no attribute '{}'"
+                             .format(type(self).__name__, name))
+
+    def __setattr__(self, name, value):
+        """sets a schema attribute in its slot, any other one apart"""
+        if name == "__dict__":
+            raise AttributeError("the __dict__ of a compact object is "
+                                 "read-only")
+        if name in type(self).schema:
+            object.__setattr__(self, name, value)
+            unset = self.__plan[0]
+            if name in unset:
+                object.__setattr__(self, "_Compact__plan",
+                                   type(self).plan(unset - {name}))
+        else:
+            if self.__extra is None:
+                object.__setattr__(self, "_Compact__extra", {})
+            self.__extra[name] = value
+        if name in self._watched:
+            models.storage.changed(self, name)
+
+    def __delattr__(self, name):
+        """deletes an attribute from its slot or from the extra ones"""
+        if name in type(self).schema:
+            object.__delattr__(self, name)
+            object.__setattr__(self, "_Compact__plan",
+                               type(self).plan(self.__plan[0] | {name}))
+        elif self.__extra and name in self.__extra:
+            del self.__extra[name]
+        else:
+            raise AttributeError(name)
+        if name in self._watched:
+            models.storage.changed(self, name)
@@ -0,0 +1,41 @@
+#!/usr/bin/python3
+"""
+Converts a FileStorage file between the json, packed and records formats
+
+Usage: python3 -m models.engine.convert <source> <destination> <format>
+
+A source saved in journal mode must be compacted first: its changes since
+the last compaction are in <source>.log, which is not converted.
+"""
+
+from models.engine.file_storage import formats, load_objects
+import os
+import sys
+
+
+def convert(source, destination, fmt):
+    """writes the objects stored in source to destination in format fmt
+
+    Raises ValueError if source has a journal, whose changes would be
+    lost.
+    """
+    if os.path.exists(source + ".log"):
+        raise ValueError("{0}.log holds changes that are not in {0}, "
+                         "compact it first".format(source))
+    with open(source, "rb") as f:
+        json_objects = load_objects(f)
+    with open(destination, "wb") as f:
+        formats[fmt].dump(json_objects.items(), f)
+    return len(json_objects)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[3] not in formats:
+        print("Usage: {} <source> <destination> <{}>".format(
+            sys.argv[0], "|".join(formats)), file=sys.stderr)
+        sys.exit(1)
+    try:
+        print(convert(*sys.argv[1:]))
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        sys.exit(1)
@@ -7,14 +7,22 @@ import models
 from models.amenity import Amenity
 from models.base_model import BaseModel, Base
 from models.city import City
+from models.engine.geo import HALF_CIRCUMFERENCE, box, distance
+from models.engine.index import TextIndex, searchable, text_of
 from models.place import Place
 from models.review import Review
 from models.state import State
 from models.user import User
+import itertools
+from itertools import chain
 from os import getenv
 import sqlalchemy
-from sqlalchemy import create_engine
-from sqlalchemy.orm import scoped_session, sessionmaker
+import threading
+from time import monotonic
+from sqlalchemy import create_engine, event, func, make_url, or_, select
+from sqlalchemy.orm import Session, scoped_session, selectinload, \
+    sessionmaker
+from sqlalchemy.pool import QueuePool
 
 classes = {
     "Amenity": Amenity,
@@ -24,6 +32,55 @@ classes = {
     "State": State,
     "User": User,
 }
+# rows fetched at a time by iterate()
+yield_per = int(getenv("HBNB_MYSQL_YIELD_PER", "1000"))
+# seconds a text index is searched before being rebuilt from the rows
+text_ttl = float(getenv("HBNB_MYSQL_TEXT_TTL", "60"))
+# set on every connection to a SQLite database
+pragmas = (
+    # readers and the writer do not block each other
+    "journal_mode=WAL",
+    # a commit is durable once checkpointed, and never corrupts the file
+    "synchronous=NORMAL",
+    # enforced as MySQL does
+    "foreign_keys=ON",
+    # a writer waits up to 5 s for another one instead of failing
+    "busy_timeout=5000",
+    # 16 MiB of page cache per connection and memory mapped reads
+    "cache_size=-16384",
+    "mmap_size=268435456",
+    "temp_store=MEMORY",
+)
+
+
+class ReplicaSession(Session):
+    """a Session reading from a replica until it writes, and from the
+    primary from then on
+
+    The replica is picked from the replicas cycle on the first read and
+    kept for the life of the session, a request in the API. Once the
+    session flushes or runs a DML statement every statement goes to the
+    primary, so that it reads its own writes whatever the replication
+    lag.
+    """
+
+    def __init__(self, replicas=None, **kwargs):
+        """Instantiate a ReplicaSession over the engines cycled by
+        replicas, or the bind alone if None"""
+        super().__init__(**kwargs)
+        self.replicas = replicas
+        self.replica = None
+        self.wrote = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        """returns the engine of the next statement"""
+        if self._flushing or getattr(clause, "is_dml", False):
+            self.wrote = True
+        if self.wrote or self.replicas is None:
+            return super().get_bind(mapper, clause=clause, **kwargs)
+        if self.replica is None:
+            self.replica = next(self.replicas)
+        return self.replica
 
 
 class DBStorage:
@@ -31,6 +88,15 @@ class DBStorage:
 
     __engine = None
     __session = None
+    # counter of changes, and the last change of each <class name>; the
+    # None entry is the last change that may have touched every class
+    __changes = itertools.count(1)
+    __generations = {}
+    # <class name> -> (monotonic time it was built, TextIndex of its
+    # searchable columns), built on the first text search, kept up to
+    # date with the committed flushes of the sessions and rebuilt after
+    # text_ttl
+    __texts = {}
 
     def __init__(self):
         """Instantiate a DBStorage object"""
@@ -39,56 +105,402 @@ class DBStorage:
         HBNB_MYSQL_HOST = getenv("HBNB_MYSQL_HOST")
         HBNB_MYSQL_DB = getenv("HBNB_MYSQL_DB")
         HBNB_ENV = getenv("HBNB_ENV")
-        self.__engine = create_engine(
-            "mysql+mysqldb://{}:{}@{}/{}".format(
+        # <engine> -> its counters of checkouts, connections opened and
+        # connections invalidated
+        self.__metrics = {}
+        self.__metrics_lock = threading.Lock()
+        if getenv("HBNB_TYPE_STORAGE") == "sqlite":
+            # an embedded database in the file HBNB_SQLITE_PATH
+            url = "sqlite:///{}".format(getenv("HBNB_SQLITE_PATH",
+                                               "hbnb.sqlite"))
+        else:
+            url = "mysql+mysqldb://{}:{}@{}/{}".format(
                 HBNB_MYSQL_USER, HBNB_MYSQL_PWD, HBNB_MYSQL_HOST, HBNB_MYSQL_DB
             )
-        )
+        self.__engine = self.__connect(url)
+        # HBNB_MYSQL_REPLICAS lists the URLs of read replicas of the
+        # database, separated by commas; the sessions of reload() read
+        # from them in turn until they write
+        self.__replicas = [
+            self.__connect(url.strip())
+            for url in getenv("HBNB_MYSQL_REPLICAS", "").split(",")
+            if url.strip()
+        ]
         if HBNB_ENV == "test":
             Base.metadata.drop_all(self.__engine)
 
-    def all(self, cls=None):
-        """query on the current database session"""
+    def __connect(self, url):
+        """returns the engine of url, its pool counted in the metrics
+
+        Each thread of the API holds a connection from request to
+        teardown: HBNB_MYSQL_POOL_SIZE are kept open and up to
+        HBNB_MYSQL_MAX_OVERFLOW more opened under load, a request
+        waiting HBNB_MYSQL_POOL_TIMEOUT seconds for one at most.
+        Connections are replaced after HBNB_MYSQL_POOL_RECYCLE seconds,
+        before the server drops them as idle, and with
+        HBNB_MYSQL_POOL_PRE_PING=1 pinged on checkout so that a stale one
+        is replaced instead of failing the request. SQLite connections
+        are local files that never go stale, and get the pragmas instead.
+        The sizes only apply to a QueuePool: an in-memory SQLite database
+        gets a connection per thread from a SingletonThreadPool.
+        """
+        options = {}
+        parsed = make_url(url)
+        if issubclass(parsed.get_dialect().get_pool_class(parsed),
+                      QueuePool):
+            options.update(
+                pool_size=int(getenv("HBNB_MYSQL_POOL_SIZE", "5")),
+                max_overflow=int(getenv("HBNB_MYSQL_MAX_OVERFLOW", "10")),
+                pool_timeout=float(getenv("HBNB_MYSQL_POOL_TIMEOUT", "30")))
+        sqlite = url.startswith("sqlite")
+        if not sqlite:
+            options["pool_recycle"] = int(getenv("HBNB_MYSQL_POOL_RECYCLE",
+                                                 "3600"))
+            options["pool_pre_ping"] = \
+                getenv("HBNB_MYSQL_POOL_PRE_PING", "1") == "1"
+        engine = create_engine(url, **options)
+        if sqlite:
+            event.listen(engine, "connect", self.__tune)
+        metrics = {"checkouts": 0, "connects": 0, "invalidated": 0}
+        self.__metrics[engine] = metrics
+        for name, metric in (("checkout", "checkouts"),
+                             ("connect", "connects"),
+                             ("invalidate", "invalidated")):
+            event.listen(engine, name, self.__counter(metrics, metric))
+        return engine
+
+    @staticmethod
+    def __tune(connection, record):
+        """sets the pragmas on a new SQLite connection"""
+        cursor = connection.cursor()
+        for pragma in pragmas:
+            cursor.execute("PRAGMA " + pragma)
+        cursor.close()
+
+    def __counter(self, metrics, metric):
+        """returns a pool event listener counting metric in metrics"""
+        def count(*args):
+            """adds one to the metric"""
+            with self.__metrics_lock:
+                metrics[metric] += 1
+        return count
+
+    def __pool_stats(self, engine):
+        """returns the counters of the connection pool of engine, and its
+        state if it is a QueuePool"""
+        pool = engine.pool
+        stats = {}
+        if isinstance(pool, QueuePool):
+            stats.update(size=pool.size(), checked_out=pool.checkedout(),
+                         checked_in=pool.checkedin(),
+                         overflow=pool.overflow())
+        with self.__metrics_lock:
+            stats.update(self.__metrics[engine])
+        return stats
+
+    def pool_stats(self):
+        """returns the state of the connection pool and its counters of
+        checkouts, connections opened and connections invalidated, with
+        those of each replica under "replicas" if there are any"""
+        stats = self.__pool_stats(self.__engine)
+        if self.__replicas:
+            stats["replicas"] = [self.__pool_stats(engine)
+                                 for engine in self.__replicas]
+        return stats
+
+    def all(self, cls=None, load=None):
+        """query on the current database session
+
+        load lists the relationships of cls to load along with its rows,
+        as names or dotted paths such as "cities.places"; each level
+        takes a single SELECT ... IN query for all the rows instead of a
+        query per row on first access.
+        """
         new_dict = {}
         for clss in classes:
             if cls is None or cls is classes[clss] or cls is clss:
-                objs = self.__session.query(classes[clss]).all()
+                query = self.__session.query(classes[clss])
+                if load and cls is not None:
+                    query = query.options(*self.__loading(classes[clss],
+                                                          load))
+                objs = query.all()
                 for obj in objs:
                     key = "{}.{}".format(obj.__class__.__name__, obj.id)
                     new_dict[key] = obj
         return new_dict
 
+    def iterate(self, cls=None):
+        """yields the objects of cls, or every object, one at a time
+
+        Rows are fetched yield_per at a time through a server side
+        cursor, and the session only holds weak references to the
+        objects it handed out, so iterating over a table does not keep
+        it in memory.
+        """
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        for clss in classes.values():
+            if cls is None or cls is clss:
+                query = self.__session.query(clss).yield_per(yield_per)
+                for obj in query:
+                    yield obj
+
+    def __touch(self, name):
+        """records a change to the objects of class name, None for all"""
+        DBStorage.__generations[name] = next(DBStorage.__changes)
+
     def new(self, obj):
         """add the object to the current database session"""
         self.__session.add(obj)
+        self.__touch(obj.__class__.__name__)
 
     def save(self):
         """commit all changes of the current database session"""
-        self.__session.commit()
+        session = self.__session
+        for obj in chain(session.new, session.dirty, session.deleted):
+            self.__touch(obj.__class__.__name__)
+        session.commit()
 
     def delete(self, obj=None):
         """delete from the current database session obj if not None"""
         if obj is not None:
             self.__session.delete(obj)
+            self.__touch(obj.__class__.__name__)
 
     def reload(self):
         """reloads data from the database"""
         Base.metadata.create_all(self.__engine)
-        sess_factory = sessionmaker(bind=self.__engine, expire_on_commit=False)
+        replicas = itertools.cycle(self.__replicas) if self.__replicas \
+            else None
+        sess_factory = sessionmaker(bind=self.__engine, class_=ReplicaSession,
+                                    replicas=replicas, expire_on_commit=False)
+        event.listen(sess_factory, "after_flush", self.__flushed)
+        event.listen(sess_factory, "after_commit", self.__retext)
+        event.listen(sess_factory, "after_rollback", self.__forget)
         Session = scoped_session(sess_factory)
         self.__session = Session
+        self.__touch(None)
 
     def close(self):
         """call remove() method on the private session attribute"""
         self.__session.remove()
 
-    def get(self, cls, id):
-        """A method to retrieve one object"""
-        obj = "{}.{}".format(cls.__name__, id)
-        return self.all().get(obj)
+    def get(self, cls, id, load=None):
+        """A method to retrieve one object, with the relationships listed
+        in load as all() does"""
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        if cls not in classes.values() or id is None:
+            return None
+        if load:
+            return self.__session.get(cls, id,
+                                      options=self.__loading(cls, load))
+        return self.__session.get(cls, id)
+
+    @staticmethod
+    def __loading(cls, load):
+        """returns the loader options of the relationship paths of cls in
+        load"""
+        options = []
+        for path in load:
+            option, clss = None, cls
+            for name in path.split("."):
+                relationship = sqlalchemy.inspect(clss).relationships.get(
+                    name)
+                if relationship is None:
+                    raise ValueError("{} has no relationship {}".format(
+                        clss.__name__, name))
+                attr = getattr(clss, name)
+                if option is None:
+                    option = selectinload(attr)
+                else:
+                    option = option.selectinload(attr)
+                clss = relationship.mapper.class_
+            options.append(option)
+        return options
+
+    def page(self, cls, limit, after=None, attr=None, value=None):
+        """returns up to limit cls objects in id order, starting after the
+        id after; with attr, only those whose column attr is value
+
+        Paging on the primary key keeps every page an index range scan,
+        however deep into the table it is.
+        """
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        if cls not in classes.values():
+            return []
+        query = self.__session.query(cls)
+        if attr is not None:
+            query = query.filter(getattr(cls, attr) == value)
+        if after is not None:
+            query = query.filter(cls.id > after)
+        return query.order_by(cls.id).limit(limit).all()
+
+    def search_places(self, states=(), cities=(), amenities=(),
+                      ranges=None):
+        """returns in id order the places of the cities of states and of
+        cities, of every city if neither is given, that have each of the
+        amenities and whose columns lie in ranges
+
+        ranges maps columns to a (low, high) pair of inclusive bounds,
+        None leaving a side open. This is one query: places joined to
+        their city for the location, and to place_amenity grouped by
+        place for the amenities, the ranges using the column indexes.
+        """
+        from models.place import place_amenity
+        query = self.__session.query(Place)
+        if states or cities:
+            query = query.join(City, Place.city_id == City.id)
+            query = query.filter(or_(City.state_id.in_(set(states)),
+                                     City.id.in_(set(cities))))
+        for attr, (low, high) in (ranges or {}).items():
+            column = getattr(Place, attr)
+            if low is not None:
+                query = query.filter(column >= low)
+            if high is not None:
+                query = query.filter(column <= high)
+        if amenities:
+            amenities = set(amenities)
+            query = query.join(place_amenity,
+                               place_amenity.c.place_id == Place.id)
+            query = query.filter(place_amenity.c.amenity_id.in_(amenities))
+            query = query.group_by(Place.id).having(
+                func.count() == len(amenities))
+        return query.order_by(Place.id).all()
+
+    def places_nearby(self, lat, lng, radius=None, k=None):
+        """returns the places within radius km of (lat, lng), or the k
+        nearest to it, or the k nearest within radius, nearest first
+
+        The latitude and longitude indexes narrow the rows down to the
+        box around the circle, and the distances of those are computed
+        here. For the k nearest without a radius, the box starts at 10 km
+        and doubles until it holds k places.
+        """
+        if k is None:
+            return self.__within(lat, lng, radius)
+        if radius is not None:
+            return self.__within(lat, lng, radius)[:k]
+        reach = 10.0
+        while True:
+            if reach >= HALF_CIRCUMFERENCE or \
+               self.__boxed(lat, lng, reach).count() >= k:
+                found = self.__within(lat, lng, reach)
+                if len(found) >= k or reach >= HALF_CIRCUMFERENCE:
+                    return found[:k]
+            reach *= 2
+
+    def __boxed(self, lat, lng, radius):
+        """returns the query of the places in the box bounding the points
+        within radius km of (lat, lng)"""
+        south, north, intervals = box(lat, lng, radius)
+        return self.__session.query(Place).filter(
+            Place.latitude.between(south, north),
+            or_(*(Place.longitude.between(west, east)
+                  for west, east in intervals)))
+
+    def __within(self, lat, lng, radius):
+        """returns the places within radius km of (lat, lng), nearest
+        first"""
+        found = []
+        for place in self.__boxed(lat, lng, min(radius, HALF_CIRCUMFERENCE)):
+            away = distance(lat, lng, place.latitude, place.longitude)
+            if away <= radius:
+                found.append((away, place.id, place))
+        found.sort(key=lambda item: item[:2])
+        return [place for away, id, place in found]
+
+    def search_text(self, cls, query, limit=None):
+        """returns the cls objects whose searchable columns hold words of
+        query, best match first, at most limit of them
+
+        The TextIndex of cls is built from its id and text columns on the
+        first search, and then follows what the sessions of this process
+        flush and commit. Rows
+        written by other processes are seen once it is rebuilt, at the
+        first search more than HBNB_MYSQL_TEXT_TTL seconds after it was
+        built (60 by default, 0 rebuilds it for every search).
+        """
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        if cls not in classes.values() or cls.__name__ not in searchable:
+            return []
+        built, index = DBStorage.__texts.get(cls.__name__, (None, None))
+        if index is None or monotonic() - built >= text_ttl:
+            built = monotonic()
+            index = TextIndex()
+            columns = [getattr(cls, attr) for attr in searchable[cls.__name__]]
+            for row in self.__session.query(cls.id, *columns).yield_per(
+                    yield_per):
+                index.add(row[0], text_of(row[1:]))
+            DBStorage.__texts[cls.__name__] = (built, index)
+        ids = [id for score, id in index.search(query, limit)]
+        objs = {}
+        for start in range(0, len(ids), 500):
+            for obj in self.__session.query(cls).filter(
+                    cls.id.in_(ids[start:start + 500])):
+                objs[obj.id] = obj
+        return [objs[id] for id in ids if id in objs]
+
+    @staticmethod
+    def __flushed(session, context):
+        """keeps the texts of the searchable objects a flush wrote, None
+        for those it deleted, until the transaction commits
+
+        Every flush is seen, whether save() commits it or autoflush,
+        flush() or a query runs it earlier.
+        """
+        if not DBStorage.__texts:
+            return
+        texts = session.info.setdefault("texts", {})
+        for obj in chain(session.new, session.dirty):
+            name = obj.__class__.__name__
+            if name in searchable:
+                texts[(name, obj.id)] = text_of(
+                    getattr(obj, attr, None) for attr in searchable[name])
+        for obj in session.deleted:
+            name = obj.__class__.__name__
+            if name in searchable:
+                texts[(name, obj.id)] = None
+
+    @staticmethod
+    def __retext(session):
+        """updates the text indexes with the texts the flushes of a
+        committed transaction kept"""
+        for (name, id), text in session.info.pop("texts", {}).items():
+            built, index = DBStorage.__texts.get(name, (None, None))
+            if index is None:
+                continue
+            if text is None:
+                index.remove(id)
+            else:
+                index.add(id, text)
+
+    @staticmethod
+    def __forget(session):
+        """drops the texts kept by the flushes of a rolled back
+        transaction"""
+        session.info.pop("texts", None)
+
+    def generation(self, cls):
+        """returns a number that changes whenever the objects of cls may
+        have changed through this storage: on new(), delete(), save() and
+        reload(); writes by other processes are not seen
+        """
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        return max(DBStorage.__generations.get(cls, 0),
+                   DBStorage.__generations.get(None, 0))
 
     def count(self, cls=None):
         """A method to count the number of objects in storage"""
-        if cls:
-            return len(self.all(cls))
-        return len(self.all())
+        if cls is not None:
+            if isinstance(cls, str):
+                cls = classes.get(cls)
+            if cls not in classes.values():
+                return 0
+            return self.__session.query(func.count(cls.id)).scalar()
+        counts = [select(func.count(clss.id)).scalar_subquery()
+                  for clss in classes.values()]
+        return sum(self.__session.query(*counts).one())
@@ -3,14 +3,34 @@
 Contains the FileStorage class
 """
 
+from array import array
+from bisect import bisect_left, bisect_right, insort
+import atexit
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+import io
+import itertools
+from itertools import chain, repeat
 import json
+from math import inf
+import mmap
 from models.amenity import Amenity
-from models.base_model import BaseModel
+from models.base_model import BaseModel, Compact
 from models.city import City
+from models.engine.geo import Grid, is_coordinate
+from models.engine.index import TextIndex, searchable, text_of
 from models.place import Place
 from models.review import Review
 from models.state import State
 from models.user import User
+import os
+from os import getenv
+import struct
+import sys
+from sys import intern
+import threading
+from time import monotonic
+import uuid
 
 classes = {
     "Amenity": Amenity,
@@ -22,6 +42,317 @@ classes = {
     "User": User,
 }
 
+# foreign keys indexed per class, for the relationship getters; a list
+# of them, like amenity_ids, is indexed under each of its items
+relations = {
+    "City": ("state_id",),
+    "Place": ("city_id", "user_id", "amenity_ids"),
+    "Review": ("place_id", "user_id"),
+}
+# numeric attributes with a sorted index per class, for range searches
+ranked = {
+    "Place": ("number_rooms", "number_bathrooms", "max_guest",
+              "price_by_night"),
+}
+# latitude and longitude attributes per class, for nearby searches
+located = {
+    "Place": ("latitude", "longitude"),
+}
+# the attributes whose values are kept per key: foreign keys, ranked,
+# then located
+indexed = {name: relations.get(name, ()) + ranked.get(name, ()) +
+           located.get(name, ())
+           for name in list(relations) + list(ranked) + list(located)}
+# the attributes whose change re-indexes a stored object, which the
+# models check before calling changed()
+watched = {name: frozenset(indexed.get(name, ()) + searchable.get(name, ()))
+           for name in list(indexed) + list(searchable)}
+for name, attrs in watched.items():
+    classes[name]._watched = attrs
+
+
+def frozen(value):
+    """returns the foreign key value, or the tuple of the distinct ids in
+    it if it is a list"""
+    if type(value) is list:
+        return tuple(dict.fromkeys(item for item in value
+                                   if type(item) is str))
+    return value
+
+
+def items(value):
+    """returns the foreign keys a frozen() value holds"""
+    return value if type(value) is tuple else (value,)
+
+
+def is_number(value):
+    """tells if value can go in a sorted index of a ranked attribute"""
+    return type(value) in (int, float) and value == value
+
+
+def within(value, low, high):
+    """tells if value is a number from low to high"""
+    return is_number(value) and low <= value <= high
+
+
+def position(index, value, key):
+    """returns where key goes in a sorted index among the keys of value,
+    and the end of those keys"""
+    values, keys = index
+    end = bisect_right(values, value)
+    return bisect_left(keys, key, bisect_left(values, value, 0, end), end), end
+
+
+def insert(index, value, key):
+    """adds key, whose ranked attribute is value, to a sorted index"""
+    i, end = position(index, value, key)
+    index[0].insert(i, value)
+    index[1].insert(i, key)
+
+
+def remove(index, value, key):
+    """removes key, whose ranked attribute is value, from a sorted index"""
+    i, end = position(index, value, key)
+    if i < end and index[1][i] == key:
+        del index[0][i]
+        del index[1][i]
+
+
+class JSONFormat:
+    """one JSON dictionary of the to_dict() of every object by key"""
+
+    @staticmethod
+    def dump(items, f):
+        """writes the (key, dictionary) pairs of items to the binary file f"""
+        text = io.TextIOWrapper(f, encoding="utf-8")
+        json.dump(dict(items), text, default=JSONFormat.default)
+        text.detach()
+
+    @staticmethod
+    def default(value):
+        """returns a timestamp left as a datetime in to_dict() format"""
+        if isinstance(value, datetime):
+            return value.isoformat(timespec="microseconds")
+        raise TypeError("{} is not JSON serializable".format(
+            type(value).__name__))
+
+    @staticmethod
+    def load(f):
+        """returns the dictionaries by key read from the binary file f"""
+        return json.load(f)
+
+
+class PackedFormat:
+    """a JSON header and a column of values for each class and attribute
+    set
+
+    Attribute and class names are stored once per group of objects that
+    share them instead of once per object, and timestamps are stored as
+    integer microseconds since the epoch. They are read back as
+    datetimes, which the objects are built from without parsing.
+
+    After the magic line comes the length of the header as an unsigned
+    little-endian 64-bit integer, then the header, a UTF-8 JSON list with
+    a {"class", "attrs", "stamped", "rows", "lengths"} object per group.
+    The columns of the groups follow in order, lengths giving the bytes
+    of each: a stamped column is rows signed little-endian 64-bit
+    integers, any other a UTF-8 JSON array.
+    """
+
+    magic = b"HBNB-PACKED-2\n"
+    epoch = datetime(1970, 1, 1)
+    length = struct.Struct("<Q")
+
+    @classmethod
+    def dump(cls, items, f):
+        """writes the (key, dictionary) pairs of items to the binary file f"""
+        groups = {}
+        for key, value in items:
+            name = value["__class__"]
+            attrs = tuple(attr for attr in value if attr != "__class__")
+            columns = groups.get((name, attrs))
+            if columns is None:
+                columns = groups[(name, attrs)] = [[] for attr in attrs]
+            for column, attr in zip(columns, attrs):
+                column.append(value[attr])
+        header = []
+        blobs = []
+        for (name, attrs), columns in groups.items():
+            stamped = []
+            lengths = []
+            for attr, column in zip(attrs, columns):
+                blob = None
+                if attr in ("created_at", "updated_at"):
+                    try:
+                        blob = struct.pack("<{}q".format(len(column)),
+                                           *map(cls.micros, column))
+                        stamped.append(attr)
+                    except (TypeError, ValueError, struct.error):
+                        pass
+                if blob is None:
+                    blob = json.dumps(column,
+                                      default=JSONFormat.default).encode()
+                blobs.append(blob)
+                lengths.append(len(blob))
+            header.append({"class": name, "attrs": attrs,
+                           "stamped": stamped, "rows": len(columns[0]),
+                           "lengths": lengths})
+        header = json.dumps(header).encode()
+        f.write(cls.magic)
+        f.write(cls.length.pack(len(header)))
+        f.write(header)
+        f.writelines(blobs)
+
+    @classmethod
+    def load(cls, f):
+        """returns the dictionaries by key read from the binary file f"""
+        if f.read(len(cls.magic)) != cls.magic:
+            raise ValueError("not a packed FileStorage file")
+        size = cls.length.unpack(f.read(cls.length.size))[0]
+        header = json.loads(f.read(size))
+        data = memoryview(f.read())
+        at = 0
+        json_objects = {}
+        micro = timedelta(microseconds=1)
+        for group in header:
+            name = group["class"]
+            attrs = tuple(group["attrs"])
+            columns = []
+            for attr, length in zip(attrs, group["lengths"]):
+                blob = data[at:at + length]
+                at += length
+                if attr in group["stamped"]:
+                    column = struct.unpack(
+                        "<{}q".format(group["rows"]), blob)
+                    columns.append(map(cls.epoch.__add__,
+                                       map(micro.__mul__, column)))
+                else:
+                    columns.append(json.loads(bytes(blob)))
+            keys = map("{}.{}".format, repeat(name),
+                       columns[attrs.index("id")])
+            attrs = repeat(attrs + ("__class__",))
+            rows = zip(*columns, repeat(name))
+            json_objects.update(zip(keys, map(dict, map(zip, attrs, rows))))
+        return json_objects
+
+    @classmethod
+    def micros(cls, stamp):
+        """returns a timestamp as microseconds since the epoch"""
+        if not isinstance(stamp, datetime):
+            stamp = datetime.fromisoformat(stamp)
+        return (stamp - cls.epoch) // timedelta(microseconds=1)
+
+
+class RecordsFormat:
+    """one JSON record per object followed by an index of their offsets
+
+    The file is memory-mapped when loaded and a record is only decoded
+    when its key is looked up, so in lazy mode an object that is never
+    used costs an index entry instead of a dictionary.
+
+    After the magic line come the UTF-8 JSON records, then the index: the
+    keys as a UTF-8 JSON list, followed by the offset of each record and
+    of the end of the last one as unsigned little-endian 64-bit integers.
+    The file ends with the offset of the index and the length of its
+    keys, two more such integers.
+    """
+
+    magic = b"HBNB-RECORDS-2\n"
+    footer = struct.Struct("<QQ")
+
+    @classmethod
+    def dump(cls, items, f):
+        """writes the (key, dictionary) pairs of items to the binary file f"""
+        f.write(cls.magic)
+        keys = []
+        offsets = array("Q")
+        offset = len(cls.magic)
+        for key, value in items:
+            record = json.dumps(value, default=JSONFormat.default).encode()
+            f.write(record)
+            keys.append(key)
+            offsets.append(offset)
+            offset += len(record)
+        offsets.append(offset)
+        if sys.byteorder == "big":
+            offsets.byteswap()
+        keys = json.dumps(keys).encode()
+        f.write(keys)
+        f.write(offsets.tobytes())
+        f.write(cls.footer.pack(offset, len(keys)))
+
+    @classmethod
+    def load(cls, f):
+        """returns the records of the binary file f, decoded on access"""
+        return MappedRecords(f, cls.magic, cls.footer)
+
+
+class MappedRecords(Mapping):
+    """the records of a RecordsFormat file by key, decoded on access"""
+
+    def __init__(self, f, magic, footer):
+        """maps the file f into memory and reads its index"""
+        self.__map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.__map[:len(magic)] != magic:
+            raise ValueError("not a records FileStorage file")
+        end = len(self.__map) - footer.size
+        index_at, length = footer.unpack(self.__map[end:])
+        keys = json.loads(self.__map[index_at:index_at + length])
+        self.__offsets = array("Q")
+        self.__offsets.frombytes(self.__map[index_at + length:end])
+        if sys.byteorder == "big":
+            self.__offsets.byteswap()
+        self.__index = dict(zip(keys, range(len(keys))))
+
+    def __getitem__(self, key):
+        """returns the dictionary recorded for key"""
+        i = self.__index[key]
+        return json.loads(self.__map[self.__offsets[i]:
+                                     self.__offsets[i + 1]])
+
+    def __iter__(self):
+        """iterates over the keys in file order"""
+        return iter(self.__index)
+
+    def __len__(self):
+        """returns the number of records"""
+        return len(self.__index)
+
+    def pop(self, key, *default):
+        """returns the dictionary recorded for key and forgets the key,
+        or default if given and there is no such key"""
+        if default and key not in self.__index:
+            return default[0]
+        value = self[key]
+        del self.__index[key]
+        return value
+
+    def close(self):
+        """unmaps the file, after which no record can be read"""
+        self.__map.close()
+
+
+formats = {
+    "json": JSONFormat,
+    "packed": PackedFormat,
+    "records": RecordsFormat,
+}
+
+
+# the key of the entry naming a snapshot written in journal mode, whose
+# token the journal started on it repeats on its first line
+snapshot_key = "__journal__.snapshot"
+
+
+def load_objects(f):
+    """returns the dictionaries by key stored in the binary file f"""
+    head = f.read(max(len(PackedFormat.magic), len(RecordsFormat.magic)))
+    f.seek(0)
+    for fmt in (PackedFormat, RecordsFormat):
+        if head.startswith(fmt.magic):
+            return fmt.load(f)
+    return JSONFormat.load(f)
+
 
 class FileStorage:
     """serializes instances to a JSON file & deserializes back to instances"""
@@ -30,59 +361,888 @@ class FileStorage:
     __file_path = "file.json"
     # dictionary - empty but will store all objects by <class name>.id
     __objects = {}
+    # dictionary - the same objects bucketed by <class name>
+    __by_class = {}
+    # dictionary - objects by (<class name>, foreign key, value)
+    __by_ref = {}
+    # dictionary - the foreign key and ranked values of each key, see
+    # indexed
+    __refs = {}
+    # dictionary - (<class name>, ranked attribute) to the sorted list of
+    # its values and the list of keys in the same order, built on the
+    # first range search and kept in order from then on
+    __by_value = {}
+    # dictionary - <class name> to the Grid of its objects by location,
+    # built on the first nearby search and kept up to date from then on
+    __grids = {}
+    # dictionary - <class name> to the TextIndex of its searchable
+    # attributes, built on the first text search and kept up to date
+    __texts = {}
+    # the __objects dictionary the indexes were built from
+    __indexed = None
+    # dictionary - objects changed since the last save, None if deleted
+    __dirty = {}
+    # dictionary - for each object not built yet, the mapping of keys to
+    # saved dictionaries it was read from
+    __raw = {}
+    # dictionary - keys per <class name> of the not built objects whose
+    # foreign keys are not indexed yet
+    __unreferenced = {}
+    # dictionary - the keys of the __by_class and __by_ref buckets that
+    # were paged through, kept sorted from then on
+    __sorted = {}
+    # guards the objects, indexes and files against concurrent requests
+    __lock = threading.RLock()
+    # the __objects dictionary and the files it was last synced with
+    __loaded = (None, None)
+    # counter of changes, and the last change of each <class name>; the
+    # None entry is the last change that may have touched every class
+    __changes = itertools.count(1)
+    __generations = {}
+    # the instances in group mode holding saves not written yet, flushed
+    # by flush_waiting() at exit
+    __waiting = set()
+
+    def __init__(self):
+        """Instantiate a FileStorage object"""
+        # "snapshot" rewrites the JSON file on every save, "journal"
+        # appends the changes to <file>.log and compacts every
+        # HBNB_FILE_COMPACT journal records
+        self.__journal = getenv("HBNB_FILE_SAVE") == "journal"
+        self.__compact_every = int(getenv("HBNB_FILE_COMPACT", "1000"))
+        self.__journaled = 0
+        # the token of the loaded or written snapshot; a journal started
+        # on another one is older than the snapshot and is not replayed
+        self.__token = None
+        # "always" fsyncs every write, "batched" fsyncs every snapshot
+        # before renaming it but its directory and the journal at most
+        # once every HBNB_FILE_FSYNC_INTERVAL seconds, and "never" leaves
+        # it to the OS
+        self.__fsync = getenv("HBNB_FILE_FSYNC", "batched")
+        if self.__fsync not in ("always", "batched", "never"):
+            raise ValueError("HBNB_FILE_FSYNC must be always, batched "
+                             "or never, not {}".format(self.__fsync))
+        self.__fsync_interval = float(getenv("HBNB_FILE_FSYNC_INTERVAL",
+                                             "1"))
+        self.__synced = None
+        # "each" writes on every save(), "group" coalesces the saves of
+        # HBNB_FILE_COMMIT_WINDOW seconds or HBNB_FILE_COMMIT_COUNT calls
+        # into one write. In group mode save() returns before the data is
+        # on disk, so an API response may be sent for changes that a
+        # crash within the window loses; call flush() to force the write.
+        self.__group = getenv("HBNB_FILE_COMMIT") == "group"
+        self.__window = float(getenv("HBNB_FILE_COMMIT_WINDOW", "0.05"))
+        self.__group_count = int(getenv("HBNB_FILE_COMMIT_COUNT", "100"))
+        self.__pending = 0
+        self.__timer = None
+        # HBNB_FILE_FORMAT picks how save() writes the file, "json" or
+        # "packed"; reload() reads either
+        self.__format = getenv("HBNB_FILE_FORMAT", "json")
+        if self.__format not in formats:
+            raise ValueError("HBNB_FILE_FORMAT must be one of {}, not {}"
+                             .format(", ".join(formats), self.__format))
+        if getenv("HBNB_FILE_PATH"):
+            self.__file_path = getenv("HBNB_FILE_PATH")
+        # with HBNB_FILE_LAZY=1 reload() keeps the saved dictionaries and
+        # objects are only built when all(), get() or related() return them
+        self.__lazy = getenv("HBNB_FILE_LAZY") == "1"
+        # with HBNB_FILE_SLOTTED=1 the objects read from the files are
+        # compact variants of their class keeping their attributes in
+        # slots, whose __dict__ is a read-only copy
+        self.__slotted = getenv("HBNB_FILE_SLOTTED") == "1"
+
+    def __buckets(self):
+        """returns __by_class, rebuilt if __objects was replaced"""
+        if FileStorage.__indexed is not FileStorage.__objects:
+            FileStorage.__by_class = {}
+            FileStorage.__by_ref = {}
+            FileStorage.__refs = {}
+            FileStorage.__raw = {}
+            FileStorage.__unreferenced = {}
+            FileStorage.__sorted = {}
+            FileStorage.__by_value = {}
+            FileStorage.__grids = {}
+            FileStorage.__texts = {}
+            FileStorage.__indexed = FileStorage.__objects
+            for key, obj in FileStorage.__objects.items():
+                self.__index(key, obj)
+            self.__touch(None)
+        return FileStorage.__by_class
+
+    def __touch(self, name):
+        """records a change to the objects of class name, None for all"""
+        FileStorage.__generations[name] = next(FileStorage.__changes)
+
+    def __index(self, key, obj):
+        """adds obj to the class and foreign key indexes"""
+        name = obj.__class__.__name__
+        bucket = FileStorage.__by_class.setdefault(name, {})
+        if FileStorage.__sorted and key not in bucket:
+            self.__sort_in(name, key)
+        bucket[key] = obj
+        if name in indexed:
+            self.__index_refs(key, name, obj,
+                              tuple(frozen(getattr(obj, attr, None))
+                                    for attr in indexed[name]))
+        if name in FileStorage.__texts:
+            FileStorage.__texts[name].add(key, text_of(
+                getattr(obj, attr, None) for attr in searchable[name]))
+
+    def __index_refs(self, key, name, obj, values):
+        """adds key to the foreign key and ranked attribute indexes
+
+        values holds the foreign keys and ranked values of the object in
+        indexed[name] order, and obj is None for an object that is not
+        built yet. Only the values are kept in __refs, the index keys are
+        rebuilt from them when the object is removed.
+        """
+        self.__unindex_refs(key, values)
+        for attr, value in zip(relations.get(name, ()), values):
+            for value in items(value):
+                ref = (name, attr, value)
+                FileStorage.__by_ref.setdefault(ref, {})[key] = obj
+                if FileStorage.__sorted:
+                    self.__sort_in(ref, key)
+        FileStorage.__refs[key] = values
 
-    def all(self, cls=None):
-        """returns the dictionary __objects"""
+    def __unindex_refs(self, key, new=None):
+        """removes key from the foreign key indexes, and moves it in the
+        ranked attribute and location indexes to the values in new, or
+        out of them"""
+        values = FileStorage.__refs.pop(key, None)
+        name = key.split(".")[0]
+        if values or new:
+            if FileStorage.__by_value:
+                self.__rank(key, name, values, new)
+            if FileStorage.__grids:
+                self.__relocate(key, name, values, new)
+        if values is not None:
+            for attr, value in zip(relations.get(name, ()), values):
+                for value in items(value):
+                    ref = (name, attr, value)
+                    bucket = FileStorage.__by_ref[ref]
+                    del bucket[key]
+                    if not bucket:
+                        del FileStorage.__by_ref[ref]
+                        FileStorage.__sorted.pop(ref, None)
+                    elif FileStorage.__sorted:
+                        self.__sort_out(ref, key)
+
+    def __sort_in(self, ref, key):
+        """adds key to the sorted keys of bucket ref, if they are kept"""
+        keys = FileStorage.__sorted.get(ref)
+        if keys is not None:
+            insort(keys, key)
+
+    def __sort_out(self, ref, key):
+        """removes key from the sorted keys of bucket ref, if they are kept"""
+        keys = FileStorage.__sorted.get(ref)
+        if keys is not None:
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                del keys[i]
+
+    def __rank(self, key, name, old, new):
+        """moves key in the sorted indexes built for the ranked attributes
+        of class name, from its values in old to those in new, either
+        being None when the key enters or leaves them
+
+        Only the attributes whose value changed are moved, as a move
+        shifts lists as long as the class.
+        """
+        for i, attr in enumerate(ranked.get(name, ()),
+                                 len(relations.get(name, ()))):
+            index = FileStorage.__by_value.get((name, attr))
+            before = old[i] if old else None
+            after = new[i] if new else None
+            if index is None or before == after:
+                continue
+            if is_number(before):
+                remove(index, before, key)
+            if is_number(after):
+                insert(index, after, key)
+
+    def __relocate(self, key, name, old, new):
+        """moves key in the Grid built for class name, from its location
+        in the values old to that in new, either being None when the key
+        enters or leaves it"""
+        grid = FileStorage.__grids.get(name)
+        if grid is None:
+            return
+        i = len(indexed[name]) - len(located[name])
+        before = old[i:i + 2] if old else None
+        after = new[i:i + 2] if new else None
+        if before != after:
+            grid.remove(key)
+            if after and is_coordinate(*after):
+                grid.add(key, *after)
+
+    def __locating(self, name):
+        """returns the Grid of the name objects by their location"""
+        # objects a reload put back unbuilt are placed in the grid as
+        # their foreign keys and ranked values are indexed
+        self.__referenced(name)
+        grid = FileStorage.__grids.get(name)
+        if grid is None:
+            refs = FileStorage.__refs
+            i = len(indexed[name]) - len(located[name])
+            grid = Grid()
+            for key in self.__buckets().get(name, ()):
+                lat, lng = refs[key][i:i + 2]
+                if is_coordinate(lat, lng):
+                    grid.add(key, lat, lng)
+            FileStorage.__grids[name] = grid
+        return grid
+
+    def __texting(self, name):
+        """returns the TextIndex of the searchable attributes of the name
+        objects"""
+        index = FileStorage.__texts.get(name)
+        if index is None:
+            index = TextIndex()
+            attrs = searchable[name]
+            for key in self.__buckets().get(name, ()):
+                obj = self.__objects.get(key)
+                if obj is not None:
+                    values = (getattr(obj, attr, None) for attr in attrs)
+                else:
+                    values = map(FileStorage.__raw[key][key].get, attrs)
+                index.add(key, text_of(values))
+            FileStorage.__texts[name] = index
+        return index
+
+    def __ranking(self, name, attr):
+        """returns the sorted values of the ranked attr of the name
+        objects and their keys in the same order"""
+        index = FileStorage.__by_value.get((name, attr))
+        if index is None:
+            self.__referenced(name)
+            refs = FileStorage.__refs
+            i = indexed[name].index(attr)
+            pairs = sorted((refs[key][i], key)
+                           for key in self.__buckets().get(name, ())
+                           if is_number(refs[key][i]))
+            index = ([value for value, key in pairs],
+                     [key for value, key in pairs])
+            FileStorage.__by_value[(name, attr)] = index
+        return index
+
+    def __put(self, key, obj):
+        """stores obj under key and indexes it"""
+        self.__buckets()
+        self.__index(key, obj)
+        self.__objects[key] = obj
+        FileStorage.__raw.pop(key, None)
+
+    def __put_raw(self, key, source):
+        """stores an object read from source[key] without building it"""
+        self.__buckets()
+        self.__remove(key)
+        name = key.split(".")[0]
+        FileStorage.__raw[key] = source
+        FileStorage.__by_class.setdefault(name, {})[key] = None
+        if FileStorage.__sorted:
+            self.__sort_in(name, key)
+        if name in indexed:
+            FileStorage.__unreferenced.setdefault(name, []).append(key)
+
+    def __remove(self, key):
+        """removes the object stored under key and its index entries"""
+        if key in self.__objects or key in FileStorage.__raw:
+            self.__objects.pop(key, None)
+            FileStorage.__raw.pop(key, None)
+            name = key.split(".")[0]
+            self.__buckets().get(name, {}).pop(key, None)
+            if name in FileStorage.__texts:
+                FileStorage.__texts[name].remove(key)
+            if FileStorage.__sorted:
+                self.__sort_out(name, key)
+            self.__unindex_refs(key)
+
+    def __built(self, key):
+        """returns the object stored under key, building it if needed"""
+        obj = self.__objects.get(key)
+        if obj is None and key in FileStorage.__raw:
+            with self.__lock:
+                source = FileStorage.__raw.get(key)
+                if source is None:
+                    return self.__objects.get(key)
+                obj = self.__build(source.pop(key))
+                self.__put(key, obj)
+        return obj
+
+    def __built_all(self, objs):
+        """returns a copy of the objs dictionary with every object built"""
+        if not FileStorage.__raw:
+            return dict(objs)
+        return {key: obj if obj is not None else self.__built(key)
+                for key, obj in list(objs.items())}
+
+    def all(self, cls=None, load=None):
+        """returns the dictionary __objects
+
+        load is there for DBStorage: relationships are index lookups here,
+        with nothing to load ahead.
+        """
         if cls is not None:
-            new_dict = {}
-            for key, value in self.__objects.items():
-                if cls == value.__class__ or cls == value.__class__.__name__:
-                    new_dict[key] = value
-            return new_dict
+            if not isinstance(cls, str):
+                cls = cls.__name__
+            return self.__built_all(self.__buckets().get(cls, {}))
+        for key in list(FileStorage.__raw):
+            self.__built(key)
         return self.__objects
 
+    def iterate(self, cls=None):
+        """yields the objects of cls, or every object, one at a time
+
+        Objects that are not built yet are built for the caller without
+        being kept, so iterating over a class does not keep it in memory.
+        """
+        if cls is None:
+            names = list(self.__buckets())
+        else:
+            names = [cls if isinstance(cls, str) else cls.__name__]
+        for name in names:
+            for key, obj in list(self.__buckets().get(name, {}).items()):
+                if obj is None:
+                    # under the lock, as reload() closes the mappings of
+                    # the files it replaces
+                    with self.__lock:
+                        source = FileStorage.__raw.get(key)
+                        if source is None:
+                            obj = self.__objects.get(key)
+                        else:
+                            obj = self.__build(source[key])
+                if obj is not None:
+                    yield obj
+
     def new(self, obj):
         """sets in __objects the obj with key <obj class name>.id"""
         if obj is not None:
             key = "{}.{}".format(obj.__class__.__name__, obj.id)
-            self.__objects[key] = obj
+            with self.__lock:
+                self.__put(key, obj)
+                FileStorage.__dirty[key] = obj
+                self.__touch(obj.__class__.__name__)
+
+    def changed(self, obj, attr):
+        """re-indexes obj, if stored, after the models saw its indexed
+        attribute attr set or deleted
+
+        Lists such as amenity_ids that are changed in place are only
+        re-indexed by new(), which save() calls.
+        """
+        id = getattr(obj, "id", None)
+        if type(id) is not str:
+            return
+        name = obj.__class__.__name__
+        key = name + "." + id
+        # most calls come from objects being initialized, not stored yet
+        if FileStorage.__objects.get(key) is not obj:
+            return
+        with self.__lock:
+            self.__buckets()
+            if FileStorage.__objects.get(key) is obj:
+                self.__index(key, obj)
+                self.__touch(name)
 
     def save(self):
         """serializes __objects to the JSON file (path: __file_path)"""
-        json_objects = {}
-        for key in self.__objects:
-            json_objects[key] = self.__objects[key].to_dict()
-        with open(self.__file_path, "w") as f:
-            json.dump(json_objects, f)
+        if not self.__group:
+            self.flush()
+            return
+        with self.__lock:
+            self.__pending += 1
+            FileStorage.__waiting.add(self)
+            if self.__pending >= self.__group_count:
+                self.flush()
+            elif self.__timer is None:
+                self.__timer = threading.Timer(self.__window, self.flush)
+                self.__timer.daemon = True
+                self.__timer.start()
 
-    def reload(self):
-        """deserializes the JSON file to __objects"""
+    def flush(self):
+        """writes the changes of every save() so far to disk"""
+        with self.__lock:
+            if self.__timer is not None:
+                self.__timer.cancel()
+                self.__timer = None
+            self.__pending = 0
+            FileStorage.__waiting.discard(self)
+            if self.__journal:
+                self.__append()
+            else:
+                self.compact()
+
+    @classmethod
+    def flush_waiting(cls):
+        """flushes every instance holding saves not written yet"""
+        with cls.__lock:
+            for storage in list(cls.__waiting):
+                storage.flush()
+
+    def compact(self):
+        """writes every object to the JSON file and drops the journal
+
+        In journal mode the snapshot gets a new token, so that a crash
+        before the journal is removed leaves a journal the next reload()
+        knows is already part of the snapshot.
+        """
+        with self.__lock:
+            token = uuid.uuid4().hex if self.__journal else None
+            head = [] if token is None else [(snapshot_key, {
+                "__class__": "__journal__", "id": "snapshot",
+                "token": token})]
+            self.__write(chain(
+                head,
+                ((key, obj.to_dict(use_pwd=True))
+                 for key, obj in self.__objects.items()),
+                ((key, source[key])
+                 for key, source in FileStorage.__raw.items())))
+            self.__token = token
+            FileStorage.__dirty.clear()
+            if os.path.exists(self.__file_path + ".log"):
+                os.remove(self.__file_path + ".log")
+            self.__journaled = 0
+            self.__synced_with_files()
+
+    def __append(self):
+        """appends the changes since the last save as one journal line"""
+        if not FileStorage.__dirty:
+            return
+        record = {}
+        for key, obj in FileStorage.__dirty.items():
+            if obj is not None:
+                obj = obj.to_dict(use_pwd=True)
+            record[key] = obj
+        with open(self.__file_path + ".log", "a") as f:
+            if f.tell() == 0 and self.__token is not None:
+                f.write(json.dumps({"__journal__": self.__token}) + "\n")
+            f.write(json.dumps(record) + "\n")
+            self.__sync(f)
+        FileStorage.__dirty.clear()
+        self.__synced_with_files()
+        self.__journaled += 1
+        if self.__journaled >= self.__compact_every:
+            self.compact()
+
+    def __write(self, items):
+        """atomically replaces the file with the (key, dictionary) items
+
+        The objects are written to a temporary file in the same directory
+        that is then renamed over the JSON file, so a crash or a reader
+        never sees a partially written file.
+        """
+        tmp_path = "{}.{}.{}.tmp".format(self.__file_path, os.getpid(),
+                                         threading.get_ident())
+        try:
+            with open(tmp_path, "wb") as f:
+                formats[self.__format].dump(items, f)
+                if self.__fsync != "never":
+                    # whatever the batching, the file renamed over the
+                    # last good one must be whole on disk first
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, self.__file_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if self.__due():
+            self.__sync_directory(
+                os.path.dirname(os.path.abspath(self.__file_path)))
+
+    def __due(self):
+        """tells if a sync is due as HBNB_FILE_FSYNC says, and if so
+        counts it as done"""
+        if self.__fsync == "never":
+            return False
+        now = monotonic()
+        if self.__fsync == "batched" and self.__synced is not None and \
+                now - self.__synced < self.__fsync_interval:
+            return False
+        self.__synced = now
+        return True
+
+    def __sync(self, f):
+        """flushes f to disk if a sync is due, True if it did"""
+        if not self.__due():
+            return False
+        f.flush()
+        os.fsync(f.fileno())
+        return True
+
+    def __sync_directory(self, directory):
+        """makes a rename inside directory durable"""
         try:
-            with open(self.__file_path, "r") as f:
-                jo = json.load(f)
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def reload(self):
+        """deserializes the JSON file to __objects
+
+        Objects changed since the last save() keep their in-memory state,
+        and nothing is read if the files did not change since they were
+        last loaded or written.
+        """
+        with self.__lock:
+            objects, files = FileStorage.__loaded
+            if objects is self.__objects and files == self.__files():
+                return
+            try:
+                with open(self.__file_path, "rb") as f:
+                    jo = load_objects(f)
+            except FileNotFoundError:
+                jo = {}
+            snapshot = jo.pop(snapshot_key, None)
+            self.__token = snapshot["token"] if snapshot else None
+            replaced = {id(source): source
+                        for source in FileStorage.__raw.values()}
+            # rebuilt on the next search rather than updated key by key,
+            # each update shifting a list as long as the class or
+            # splitting a text into words again
+            FileStorage.__by_value = {}
+            FileStorage.__texts = {}
             for key in jo:
-                self.__objects[key] = classes[jo[key]["__class__"]](**jo[key])
-        except Exception:
+                if key not in FileStorage.__dirty:
+                    self.__load(key, jo)
+            self.__replay()
+            self.__release(replaced)
+            self.__synced_with_files()
+            self.__touch(None)
+
+    def __release(self, sources):
+        """builds the objects still read from the sources by id, which the
+        new files did not replace, then closes the mapped ones so that
+        the replaced files are not kept in memory"""
+        for key, source in list(FileStorage.__raw.items()):
+            if id(source) in sources:
+                self.__put(key, self.__build(source[key]))
+        for source in sources.values():
+            if isinstance(source, MappedRecords):
+                source.close()
+
+    def __files(self):
+        """returns what identifies the current JSON file and journal"""
+        files = [self.__file_path]
+        for path in (self.__file_path, self.__file_path + ".log"):
+            try:
+                st = os.stat(path)
+                files.append((st.st_ino, st.st_size, st.st_mtime_ns))
+            except FileNotFoundError:
+                files.append(None)
+        return tuple(files)
+
+    def __synced_with_files(self):
+        """records that __objects holds what the files hold"""
+        FileStorage.__loaded = (self.__objects, self.__files())
+
+    def __load(self, key, source):
+        """stores the object read from source[key], unless lazy built"""
+        if self.__lazy:
+            self.__put_raw(key, source)
+        else:
+            self.__put(key, self.__build(source[key]))
+
+    def __build(self, value):
+        """returns the object a to_dict() dictionary describes
+
+        The object is built without going through __init__, as an
+        instance of its class or, with HBNB_FILE_SLOTTED=1, of its
+        compact variant, unless its id or timestamps are missing or
+        malformed. Foreign keys are interned and equal timestamps shared,
+        as they repeat across objects.
+        """
+        name = value["__class__"]
+        cls = classes[name]
+        try:
+            created_at = value["created_at"]
+            if not isinstance(created_at, datetime):
+                created_at = datetime.fromisoformat(created_at)
+            updated_at = value["updated_at"]
+            if not isinstance(updated_at, datetime):
+                updated_at = datetime.fromisoformat(updated_at)
+            value["id"]
+        except (KeyError, TypeError, ValueError):
+            # __init__ fills in what is missing, but must not hash the
+            # saved password again as it does a new one
+            password = value.pop("password", None)
+            obj = cls(**value)
+            if password is not None:
+                obj.password = password
+            return obj
+        value["created_at"] = created_at
+        value["updated_at"] = created_at
+        if updated_at != created_at:
+            value["updated_at"] = updated_at
+        for attr in relations.get(name, ()):
+            ref = value.get(attr)
+            if type(ref) is str:
+                value[attr] = intern(ref)
+            elif type(ref) is list:
+                value[attr] = [intern(item) if type(item) is str else item
+                               for item in ref]
+        if self.__slotted:
+            return Compact.variant(cls).build(value)
+        obj = object.__new__(cls)
+        obj.__dict__.update(value)
+        del obj.__dict__["__class__"]
+        return obj
+
+    def __replay(self):
+        """applies the journal on top of the loaded JSON file
+
+        A line cut short by a crash is ignored and trimmed from the
+        journal, so every save() is applied entirely or not at all. A
+        journal whose first line names the token of another snapshot
+        than the loaded one, or that names none when the snapshot has
+        one, was started before the snapshot was written and is removed
+        instead.
+        """
+        self.__journaled = 0
+        valid = 0
+        try:
+            with open(self.__file_path + ".log", "rb") as f:
+                for i, line in enumerate(f):
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("incomplete journal line")
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    token = None
+                    if i == 0 and "__journal__" in record:
+                        token = record["__journal__"]
+                    if i == 0 and token != self.__token:
+                        f.close()
+                        os.remove(self.__file_path + ".log")
+                        return
+                    if token is not None:
+                        valid += len(line)
+                        continue
+                    for key, value in record.items():
+                        if key in FileStorage.__dirty:
+                            continue
+                        if value is None:
+                            self.__remove(key)
+                        else:
+                            self.__load(key, record)
+                    valid += len(line)
+                    self.__journaled += 1
+            if valid < os.path.getsize(self.__file_path + ".log"):
+                with open(self.__file_path + ".log", "r+b") as f:
+                    f.truncate(valid)
+        except FileNotFoundError:
             pass
 
     def delete(self, obj=None):
         """delete obj from __objects if it’s inside"""
         if obj is not None:
             key = "{}.{}".format(obj.__class__.__name__, obj.id)
-            if key in self.__objects:
-                del self.__objects[key]
+            with self.__lock:
+                # in lazy mode iterate() hands out objects left unbuilt
+                if key in self.__objects or key in FileStorage.__raw:
+                    self.__remove(key)
+                    FileStorage.__dirty[key] = None
+                    self.__touch(obj.__class__.__name__)
 
     def close(self):
         """call reload() method for deserializing the JSON file to objects"""
         self.reload()
 
-    def get(self, cls, id):
-        """A method to retrieve one object"""
-        obj = "{}.{}".format(cls.__name__, id)
-        return self.all().get(obj)
+    def get(self, cls, id, load=None):
+        """A method to retrieve one object; load is ignored as in all()"""
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        return self.__built("{}.{}".format(cls, id))
 
     def count(self, cls=None):
         """A method to count the number of objects in storage"""
-        if cls:
-            return len(self.all(cls))
-        return len(self.all())
+        if cls is not None:
+            if not isinstance(cls, str):
+                cls = cls.__name__
+            return len(self.__buckets().get(cls, {}))
+        self.__buckets()
+        return len(self.__objects) + len(FileStorage.__raw)
+
+    def pool_stats(self):
+        """returns the connection pool metrics, none without a database"""
+        return {}
+
+    def generation(self, cls):
+        """returns a number that changes whenever the objects of cls may
+        have changed: on new(), delete() and reloads that read the files
+        """
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        self.__buckets()
+        return max(FileStorage.__generations.get(cls, 0),
+                   FileStorage.__generations.get(None, 0))
+
+    def related(self, cls, attr, value):
+        """returns the list of cls objects whose foreign key attr is value"""
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        self.__referenced(cls)
+        objs = self.__by_ref.get((cls, attr, value), {})
+        return list(self.__built_all(objs).values())
+
+    def __referenced(self, cls):
+        """indexes the foreign keys and ranked values of the cls objects
+        not built yet"""
+        self.__buckets()
+        if cls in FileStorage.__unreferenced:
+            with self.__lock:
+                # a missing attribute reads as the class default, as it
+                # will once the object is built
+                attrs = indexed[cls]
+                defaults = [getattr(classes[cls], attr, None)
+                            for attr in attrs]
+                for key in FileStorage.__unreferenced.pop(cls, ()):
+                    source = FileStorage.__raw.get(key)
+                    if source is not None:
+                        value = source[key]
+                        self.__index_refs(key, cls, None, tuple(
+                            frozen(value.get(attr, default))
+                            for attr, default in zip(attrs, defaults)))
+
+    def page(self, cls, limit, after=None, attr=None, value=None):
+        """returns up to limit cls objects in id order, starting after the
+        id after; with attr, only those whose foreign key attr is value
+
+        The keys of each bucket paged through are sorted once and then
+        kept in order as objects come and go.
+        """
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        with self.__lock:
+            if attr is None:
+                ref, index = cls, self.__buckets()
+            else:
+                self.__referenced(cls)
+                ref, index = (cls, attr, value), FileStorage.__by_ref
+            keys = FileStorage.__sorted.get(ref)
+            if keys is None:
+                if attr is not None and attr not in relations.get(cls, ()):
+                    keys = sorted(key for key, obj in self.all(cls).items()
+                                  if getattr(obj, attr, None) == value)
+                elif ref in index:
+                    keys = FileStorage.__sorted[ref] = sorted(index[ref])
+                else:
+                    keys = []
+            start = 0
+            if after is not None:
+                start = bisect_right(keys, "{}.{}".format(cls, after))
+            keys = keys[start:start + limit]
+        return [self.__built(key) for key in keys]
+
+    def search_places(self, states=(), cities=(), amenities=(),
+                      ranges=None):
+        """returns in id order the places of the cities of states and of
+        cities, of every city if neither is given, that have each of the
+        amenities and whose ranked attributes lie in ranges
+
+        ranges maps ranked attributes to a (low, high) pair of inclusive
+        bounds, None leaving a side open. Every criterion is a set of
+        keys read from the indexes: the places of the wanted cities, of
+        each amenity, and the slice of a sorted index between two
+        bounds. They are intersected from the smallest up, so a search
+        costs about as much as its most selective criterion.
+        """
+        with self.__lock:
+            self.__referenced("City")
+            self.__referenced("Place")
+            by_ref = FileStorage.__by_ref
+            refs = FileStorage.__refs
+            buckets = sorted((by_ref.get(("Place", "amenity_ids", id), {})
+                              for id in set(amenities)), key=len)
+            city_ids = None
+            if states or cities:
+                city_ids = set(cities)
+                for state_id in states:
+                    city_ids.update(key.partition(".")[2] for key in
+                                    by_ref.get(("City", "state_id", state_id),
+                                               ()))
+                located = [by_ref.get(("Place", "city_id", city_id), {})
+                           for city_id in city_ids]
+                if not buckets or \
+                   sum(map(len, located)) <= len(buckets[0]):
+                    # the location is the smallest criterion
+                    buckets.insert(0, dict.fromkeys(
+                        chain.from_iterable(located)))
+                    city_ids = None
+            spans = []
+            for attr, (low, high) in (ranges or {}).items():
+                low = -inf if low is None else low
+                high = inf if high is None else high
+                values, ranked_keys = self.__ranking("Place", attr)
+                start = bisect_left(values, low)
+                stop = max(start, bisect_right(values, high))
+                spans.append((stop - start, ranked_keys, start, stop,
+                              indexed["Place"].index(attr), low, high))
+            spans.sort(key=lambda span: span[0])
+            if spans and (not buckets or spans[0][0] < len(buckets[0])):
+                size, ranked_keys, start, stop = spans.pop(0)[:4]
+                keys = ranked_keys[start:stop]
+                for bucket in buckets:
+                    keys = [key for key in keys if key in bucket]
+            else:
+                if not buckets:
+                    keys = self.__buckets().get("Place", {}).keys()
+                elif len(buckets) == 1:
+                    keys = buckets[0].keys()
+                else:
+                    # dict views intersect by walking the smaller one
+                    keys = buckets[0].keys() & buckets[1].keys()
+                for bucket in buckets[2:]:
+                    keys = [key for key in keys if key in bucket]
+            if city_ids is not None:
+                city = relations["Place"].index("city_id")
+                keys = [key for key in keys if refs[key][city] in city_ids]
+            for size, ranked_keys, start, stop, i, low, high in spans:
+                keys = [key for key in keys
+                        if within(refs[key][i], low, high)]
+            keys = sorted(keys)
+        return [self.__built(key) for key in keys]
+
+    def places_nearby(self, lat, lng, radius=None, k=None):
+        """returns the places within radius km of (lat, lng), or the k
+        nearest to it, or the k nearest within radius, nearest first
+
+        Only the cells of a Grid around the point are looked at, the
+        Grid being built on the first call and kept up to date by new(),
+        delete() and changes to the location of a stored place.
+        """
+        with self.__lock:
+            grid = self.__locating("Place")
+            if k is None:
+                found = grid.within(lat, lng, radius)
+            else:
+                found = grid.nearest(lat, lng, k, radius)
+        return [self.__built(key) for distance, key in found]
+
+    def search_text(self, cls, query, limit=None):
+        """returns the cls objects whose searchable attributes hold words
+        of query, best match first, at most limit of them
+
+        The TextIndex of cls is built on the first search and kept up to
+        date by new(), delete() and changes to the searchable attributes
+        of a stored object.
+        """
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        if cls not in searchable:
+            return []
+        with self.__lock:
+            found = self.__texting(cls).search(query, limit)
+        return [self.__built(key) for score, key in found]
+
+
+atexit.register(FileStorage.flush_waiting)
@@ -0,0 +1,152 @@
+#!/usr/bin/python3
+"""
+Contains the distance helpers and the Grid index of nearby searches
+"""
+
+from math import asin, cos, degrees, floor, pi, radians, sin, sqrt
+
+# mean radius of the Earth, in kilometers
+EARTH_RADIUS = 6371.0088
+# no two points are further apart than this, in kilometers
+HALF_CIRCUMFERENCE = pi * EARTH_RADIUS
+
+
+def is_coordinate(lat, lng):
+    """tells if lat and lng are numbers a point can be placed at"""
+    return type(lat) in (int, float) and type(lng) in (int, float) and \
+        -90 <= lat <= 90 and -180 <= lng <= 180
+
+
+def distance(lat1, lng1, lat2, lng2):
+    """returns the great circle distance between two points in km"""
+    lat1, lng1, lat2, lng2 = map(radians, (lat1, lng1, lat2, lng2))
+    h = sin((lat2 - lat1) / 2) ** 2 + \
+        cos(lat1) * cos(lat2) * sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS * asin(min(1.0, sqrt(h)))
+
+
+def box(lat, lng, radius):
+    """returns the latitudes and the longitude intervals bounding the
+    points within radius km of (lat, lng)
+
+    The result is (south, north, intervals), intervals being one or, when
+    the box crosses the antimeridian, two (west, east) pairs.
+    """
+    angle = radius / EARTH_RADIUS
+    south = lat - degrees(angle)
+    north = lat + degrees(angle)
+    if south <= -90 or north >= 90 or angle >= pi / 2:
+        # the circle holds a pole, so every longitude
+        return max(south, -90), min(north, 90), [(-180, 180)]
+    spread = degrees(asin(min(1.0, sin(angle) / cos(radians(lat)))))
+    west, east = lng - spread, lng + spread
+    if west < -180:
+        return south, north, [(west + 360, 180), (-180, east)]
+    if east > 180:
+        return south, north, [(west, 180), (-180, east - 360)]
+    return south, north, [(west, east)]
+
+
+class Grid:
+    """points by key bucketed in cells of size degrees
+
+    A search only looks at the cells the bounding box of its circle
+    covers. Each point keeps its latitude in radians, longitude in
+    radians and cosine of latitude, so refining the candidates of those
+    cells is a few multiplications per point.
+    """
+
+    def __init__(self, size=0.5):
+        """Instantiate an empty Grid"""
+        self.size = size
+        self.columns = int(round(360 / size))
+        # (row, column) -> {key: (latitude, longitude, cos(latitude))}
+        self.cells = {}
+        # key -> (row, column)
+        self.where = {}
+
+    def __len__(self):
+        """returns the number of points"""
+        return len(self.where)
+
+    def cell(self, lat, lng):
+        """returns the (row, column) of the cell of (lat, lng)"""
+        return (int(floor(lat / self.size)),
+                int(floor((lng + 180) / self.size)) % self.columns)
+
+    def add(self, key, lat, lng):
+        """places key at (lat, lng), moving it if it was elsewhere"""
+        self.remove(key)
+        cell = self.cell(lat, lng)
+        lat = radians(lat)
+        self.cells.setdefault(cell, {})[key] = (lat, radians(lng), cos(lat))
+        self.where[key] = cell
+
+    def remove(self, key):
+        """removes key if it was placed"""
+        cell = self.where.pop(key, None)
+        if cell is not None:
+            points = self.cells[cell]
+            del points[key]
+            if not points:
+                del self.cells[cell]
+
+    def covering(self, south, north, intervals):
+        """yields the point dictionaries of the cells of the box"""
+        rows = range(int(floor(south / self.size)),
+                     int(floor(north / self.size)) + 1)
+        columns = set()
+        for west, east in intervals:
+            first = int(floor((west + 180) / self.size))
+            last = int(floor((east + 180) / self.size))
+            columns.update(column % self.columns
+                           for column in range(first, last + 1))
+        if len(rows) * len(columns) > len(self.cells):
+            # fewer occupied cells than cells in the box
+            for (row, column), points in self.cells.items():
+                if row in rows and column in columns:
+                    yield points
+            return
+        for row in rows:
+            for column in columns:
+                points = self.cells.get((row, column))
+                if points is not None:
+                    yield points
+
+    def within(self, lat, lng, radius):
+        """returns the (distance, key) pairs of the points within radius
+        km of (lat, lng), nearest first"""
+        radius = min(radius, HALF_CIRCUMFERENCE)
+        lat0, lng0 = radians(lat), radians(lng)
+        cos0 = cos(lat0)
+        # haversine of the radius: a point is within it when the
+        # haversine of its distance is no larger
+        limit = sin(radius / (2 * EARTH_RADIUS)) ** 2
+        found = []
+        for points in self.covering(*box(lat, lng, radius)):
+            for key, (lat1, lng1, cos1) in points.items():
+                h = sin((lat1 - lat0) / 2) ** 2 + \
+                    cos0 * cos1 * sin((lng1 - lng0) / 2) ** 2
+                if h <= limit:
+                    found.append((h, key))
+        found.sort()
+        return [(2 * EARTH_RADIUS * asin(min(1.0, sqrt(h))), key)
+                for h, key in found]
+
+    def nearest(self, lat, lng, k, radius=None):
+        """returns the (distance, key) pairs of the k points nearest to
+        (lat, lng), within radius km if given, nearest first
+
+        The search radius starts at a cell and doubles until it holds k
+        points: every point outside it is further than those inside.
+        """
+        if radius is not None:
+            return self.within(lat, lng, radius)[:k]
+        if len(self) <= k:
+            return self.within(lat, lng, HALF_CIRCUMFERENCE)[:k]
+        reach = self.size * pi / 180 * EARTH_RADIUS
+        while True:
+            found = self.within(lat, lng, reach)
+            if len(found) >= k or reach >= HALF_CIRCUMFERENCE:
+                return found[:k]
+            reach *= 2
@@ -0,0 +1,109 @@
+#!/usr/bin/python3
+"""
+Contains the TextIndex class of full text searches
+"""
+
+from heapq import nsmallest
+from math import log
+import re
+
+# text attributes searched per class
+searchable = {
+    "Place": ("name", "description"),
+    "Review": ("text",),
+}
+
+words = re.compile(r"\w+")
+
+
+def tokens(text):
+    """returns the lower case words of text, in order"""
+    if type(text) is not str:
+        return []
+    return words.findall(text.lower())
+
+
+def text_of(values):
+    """returns the text to index for the searchable values of an object"""
+    return " ".join(value for value in values if type(value) is str)
+
+
+class TextIndex:
+    """an inverted index from words to the keys whose text holds them,
+    ranking matches with BM25
+
+    Each word has a postings dictionary of the keys holding it and how
+    many times. A search adds up the BM25 score of each word of the
+    query over its postings only, so its cost follows how common the
+    words of the query are rather than the number of texts.
+    """
+
+    # term frequency saturation and length normalization of BM25
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        """Instantiate an empty TextIndex"""
+        # word -> {key: occurrences of the word in the text of key}
+        self.postings = {}
+        # key -> (number of words in its text, its distinct words)
+        self.documents = {}
+        # number of words in all the texts
+        self.length = 0
+
+    def __len__(self):
+        """returns the number of texts indexed"""
+        return len(self.documents)
+
+    def add(self, key, text):
+        """indexes text under key, in place of the text it had"""
+        self.remove(key)
+        found = tokens(text)
+        if not found:
+            return
+        counts = {}
+        for word in found:
+            counts[word] = counts.get(word, 0) + 1
+        for word, count in counts.items():
+            self.postings.setdefault(word, {})[key] = count
+        self.documents[key] = (len(found), tuple(counts))
+        self.length += len(found)
+
+    def remove(self, key):
+        """removes the text of key if it was indexed"""
+        document = self.documents.pop(key, None)
+        if document is not None:
+            length, found = document
+            self.length -= length
+            for word in found:
+                postings = self.postings[word]
+                del postings[key]
+                if not postings:
+                    del self.postings[word]
+
+    def search(self, query, limit=None):
+        """returns the (score, key) pairs of the texts holding words of
+        query, best first and then by key, at most limit of them"""
+        count = len(self.documents)
+        if not count:
+            return []
+        average = self.length / count
+        k1, b = self.k1, self.b
+        documents = self.documents
+        scores = {}
+        for word in set(tokens(query)):
+            postings = self.postings.get(word)
+            if not postings:
+                continue
+            idf = log(1 + (count - len(postings) + 0.5) /
+                      (len(postings) + 0.5))
+            for key, occurrences in postings.items():
+                norm = k1 * (1 - b + b * documents[key][0] / average)
+                scores[key] = scores.get(key, 0) + \
+                    idf * occurrences * (k1 + 1) / (occurrences + norm)
+        ranked = [(-score, key) for key, score in scores.items()]
+        if limit is None:
+            ranked.sort()
+        else:
+            ranked = nsmallest(limit, ranked)
+        return [(-score, key) for score, key in ranked]
@@ -27,8 +27,7 @@ class State(BaseModel, Base):
         def cities(self):
             """getter for list of city instances related to the state"""
             city_list = []
-            all_cities = models.storage.all(City)
-            for city in all_cities.values():
+            for city in models.storage.related(City, "state_id", self.id):
                 if city.state_id == self.id:
                     city_list.append(city)
             return city_list
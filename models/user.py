@@ -34,6 +34,28 @@ class User(BaseModel, Base):
                 kwargs['password'].encode()
             ).hexdigest()
 
+    if models.storage_t != 'db':
+        @property
+        def places(self):
+            """getter for list of place instances owned by the user"""
+            from models.place import Place
+            place_list = []
+            for place in models.storage.related(Place, "user_id", self.id):
+                if place.user_id == self.id:
+                    place_list.append(place)
+            return place_list
+
+        @property
+        def reviews(self):
+            """getter for list of review instances written by the user"""
+            from models.review import Review
+            review_list = []
+            for review in models.storage.related(Review, "user_id",
+                                                 self.id):
+                if review.user_id == self.id:
+                    review_list.append(review)
+            return review_list
+
     def update_password(self, new_password):
         """Update the user's password and hash it"""
         self.password = hashlib.md5(
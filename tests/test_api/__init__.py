@@ -0,0 +1,46 @@
+#!/usr/bin/python3
+"""
+Contains the APITestCase base class of the API tests
+"""
+
+from api.v1 import cache
+from api.v1.app import app
+import models
+from models.engine.file_storage import FileStorage
+import os
+import unittest
+
+
+class APITestCase(unittest.TestCase):
+    """Base for tests calling the API with a test client, the storage
+    writing to a scratch file and the response cache emptied"""
+
+    path = "file_api_test.json"
+
+    def setUp(self):
+        """isolate the stored objects and the response cache"""
+        self.saved = FileStorage._FileStorage__objects
+        FileStorage._FileStorage__objects = {}
+        self.file_path = models.storage._FileStorage__file_path
+        models.storage._FileStorage__file_path = self.path
+        cache.responses.clear()
+        cache.held = 0
+        cache.metrics.update(hits=0, misses=0)
+        self.client = app.test_client()
+
+    def tearDown(self):
+        """restore the stored objects and remove the scratch files"""
+        models.storage._FileStorage__file_path = self.file_path
+        FileStorage._FileStorage__objects = self.saved
+        FileStorage._FileStorage__dirty.clear()
+        cache.responses.clear()
+        cache.held = 0
+        for path in (self.path, self.path + ".log"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def post(self, url, data):
+        """returns the JSON of the object created by POST url"""
+        response = self.client.post("/api/v1" + url, json=data)
+        self.assertEqual(response.status_code, 201)
+        return response.get_json()
@@ -0,0 +1,190 @@
+#!/usr/bin/python3
+"""
+Contains the TestCacheDocs, TestConditionalGet and TestResponseCache
+classes
+"""
+
+import inspect
+from api.v1 import cache
+import models
+from models.state import State
+import pep8
+from tests.test_api import APITestCase
+import unittest
+from unittest import mock
+
+
+class TestCacheDocs(unittest.TestCase):
+    """Tests to check the documentation and style of cache.py"""
+
+    def test_pep8_conformance_cache(self):
+        """Test that api/v1/cache.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(["api/v1/cache.py",
+                                    "tests/test_api/__init__.py",
+                                    "tests/test_api/test_cache.py"])
+        self.assertEqual(
+            result.total_errors, 0, "Found code style errors (and warnings)."
+        )
+
+    def test_cache_docstrings(self):
+        """Test for the module and function docstrings"""
+        self.assertTrue(len(cache.__doc__) >= 1)
+        for name, func in inspect.getmembers(cache, inspect.isfunction):
+            if func.__module__ == cache.__name__:
+                self.assertTrue(len(func.__doc__) >= 1,
+                                "{:s} needs a docstring".format(name))
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestConditionalGet(APITestCase):
+    """Test the ETag and Last-Modified validators of the responses"""
+
+    def setUp(self):
+        """create a few states, the response cache being off"""
+        super().setUp()
+        patcher = mock.patch.object(cache, "enabled", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.states = [self.post("/states", {"name": name})
+                       for name in ("Lagos", "Abuja")]
+        self.url = "/api/v1/states/" + self.states[0]["id"]
+
+    def test_strong_etag(self):
+        """Test that single objects and lists carry a strong ETag"""
+        for url in (self.url, "/api/v1/states"):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                etag, weak = response.get_etag()
+                self.assertTrue(etag)
+                self.assertFalse(weak)
+                self.assertEqual(self.client.get(url).get_etag()[0], etag)
+
+    def test_if_none_match(self):
+        """Test that a matching If-None-Match gets an empty 304 without
+        serializing the objects"""
+        for url in (self.url, "/api/v1/states"):
+            with self.subTest(url=url):
+                etag = self.client.get(url).get_etag()[0]
+                with mock.patch.object(State, "to_dict",
+                                       autospec=True) as to_dict:
+                    response = self.client.get(
+                        url, headers={"If-None-Match": '"{}"'.format(etag)})
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.get_data(), b"")
+                self.assertFalse(to_dict.called)
+
+    def test_if_modified_since(self):
+        """Test that If-Modified-Since is only honoured for one object"""
+        for url, status in ((self.url, 304), ("/api/v1/states", 200)):
+            with self.subTest(url=url):
+                last_modified = self.client.get(url).headers["Last-Modified"]
+                response = self.client.get(
+                    url, headers={"If-Modified-Since": last_modified})
+                self.assertEqual(response.status_code, status)
+
+    def test_etag_changes_on_put(self):
+        """Test that updating an object changes its ETag"""
+        etag = self.client.get(self.url).get_etag()[0]
+        self.client.put(self.url, json={"name": "Kano"})
+        self.assertNotEqual(self.client.get(self.url).get_etag()[0], etag)
+
+    def test_etag_changes_on_amenity_link(self):
+        """Test that linking and unlinking an amenity changes the ETag of
+        the place"""
+        city = self.post("/states/{}/cities".format(self.states[0]["id"]),
+                         {"name": "Ikeja"})
+        user = self.post("/users", {"email": "a@b.c", "password": "pwd"})
+        place = self.post("/cities/{}/places".format(city["id"]),
+                          {"name": "Home", "user_id": user["id"]})
+        amenity = self.post("/amenities", {"name": "Wifi"})
+        url = "/api/v1/places/" + place["id"]
+        link = "{}/amenities/{}".format(url, amenity["id"])
+        etags = [self.client.get(url).get_etag()[0]]
+        self.assertEqual(self.client.post(link).status_code, 201)
+        etags.append(self.client.get(url).get_etag()[0])
+        self.assertEqual(self.client.delete(link).status_code, 200)
+        etags.append(self.client.get(url).get_etag()[0])
+        self.assertEqual(len(set(etags)), 3)
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestResponseCache(APITestCase):
+    """Test the response cache of the list views"""
+
+    def setUp(self):
+        """create a state and turn the response cache on"""
+        super().setUp()
+        patcher = mock.patch.object(cache, "enabled", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.state = self.post("/states", {"name": "Lagos"})
+
+    def x_cache(self, url="/api/v1/states"):
+        """returns the X-Cache header of GET url"""
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.headers["X-Cache"]
+
+    def test_hit(self):
+        """Test that a second request is served from the cache"""
+        self.assertEqual(self.x_cache(), "MISS")
+        self.assertEqual(self.x_cache(), "HIT")
+        first = self.client.get("/api/v1/states")
+        self.assertEqual(first.get_json(), [self.state])
+        etag = first.get_etag()[0]
+        response = self.client.get(
+            "/api/v1/states", headers={"If-None-Match": '"{}"'.format(etag)})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["X-Cache"], "HIT")
+
+    def test_invalidation(self):
+        """Test that POST, PUT and DELETE outdate the cached responses"""
+        url = "/api/v1/states/" + self.state["id"]
+        writes = (
+            lambda: self.post("/states", {"name": "Abuja"}),
+            lambda: self.client.put(url, json={"name": "Kano"}),
+            lambda: self.client.delete(url),
+        )
+        for write in writes:
+            self.x_cache()
+            self.assertEqual(self.x_cache(), "HIT")
+            write()
+            self.assertEqual(self.x_cache(), "MISS")
+        names = [state["name"] for state in
+                 self.client.get("/api/v1/states").get_json()]
+        self.assertEqual(names, ["Abuja"])
+
+    def test_stats(self):
+        """Test the counters of /api/v1/cache"""
+        self.x_cache()
+        self.x_cache()
+        self.x_cache()
+        stats = self.client.get("/api/v1/cache").get_json()
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["entries"], 1)
+        self.assertEqual(stats["bytes"],
+                         len(self.client.get("/api/v1/states").get_data()))
+
+    def test_unread_params(self):
+        """Test that the parameters no view reads share one entry"""
+        self.assertEqual(self.x_cache("/api/v1/states?junk=1"), "MISS")
+        self.assertEqual(self.x_cache("/api/v1/states?junk=2"), "HIT")
+        self.assertEqual(self.x_cache("/api/v1/states?limit=1"), "MISS")
+        self.assertEqual(cache.stats()["entries"], 2)
+
+    def test_budget(self):
+        """Test that the oldest responses leave to stay within budget"""
+        length = len(self.client.get("/api/v1/states").get_data())
+        with mock.patch.object(cache, "budget", length + 1):
+            self.assertEqual(self.x_cache("/api/v1/states?limit=5"), "MISS")
+            self.assertEqual(cache.stats()["entries"], 1)
+            self.assertEqual(self.x_cache(), "MISS")
+            self.assertEqual(self.x_cache("/api/v1/states?limit=5"), "MISS")
+            self.assertEqual(self.x_cache("/api/v1/states?limit=5"), "HIT")
+            self.assertLessEqual(cache.held, length + 1)
+        with mock.patch.object(cache, "budget", 1):
+            self.x_cache("/api/v1/states?limit=6")
+            self.assertNotIn(("/api/v1/states", (("limit", "6"),)),
+                             cache.responses)
@@ -0,0 +1,127 @@
+#!/usr/bin/python3
+"""
+Contains the TestPagingDocs and TestPaging classes
+"""
+
+import inspect
+from api.v1 import cache, paging
+import models
+import pep8
+from tests.test_api import APITestCase
+import unittest
+from unittest import mock
+
+
+class TestPagingDocs(unittest.TestCase):
+    """Tests to check the documentation and style of paging.py"""
+
+    def test_pep8_conformance_paging(self):
+        """Test that api/v1/paging.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(["api/v1/paging.py",
+                                    "tests/test_api/test_paging.py"])
+        self.assertEqual(
+            result.total_errors, 0, "Found code style errors (and warnings)."
+        )
+
+    def test_paging_docstrings(self):
+        """Test for the module and function docstrings"""
+        self.assertTrue(len(paging.__doc__) >= 1)
+        for name, func in inspect.getmembers(paging, inspect.isfunction):
+            if func.__module__ == paging.__name__:
+                self.assertTrue(len(func.__doc__) >= 1,
+                                "{:s} needs a docstring".format(name))
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestPaging(APITestCase):
+    """Test the limit and cursor parameters of the collections"""
+
+    def setUp(self):
+        """create five states and two cities of the first one"""
+        super().setUp()
+        patcher = mock.patch.object(cache, "enabled", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.states = [self.post("/states", {"name": str(i)})
+                       for i in range(5)]
+        self.ids = sorted(state["id"] for state in self.states)
+
+    def walk(self, url):
+        """returns the ids of the pages of url following the Link
+        headers, and the number of pages"""
+        ids = []
+        pages = 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [obj["id"] for obj in response.get_json()]
+            pages += 1
+            link = response.headers.get("Link")
+            cursor = response.headers.get("X-Next-Cursor")
+            self.assertEqual(link is None, cursor is None)
+            url = None
+            if link:
+                self.assertIn("cursor=" + cursor, link)
+                self.assertTrue(link.endswith('>; rel="next"'))
+                url = link[1:link.index(">")]
+        return ids, pages
+
+    def test_limit_and_cursor(self):
+        """Test that the pages hold limit objects in id order"""
+        response = self.client.get("/api/v1/states?limit=2")
+        self.assertEqual([obj["id"] for obj in response.get_json()],
+                         self.ids[:2])
+        self.assertEqual(response.headers["X-Next-Cursor"], self.ids[1])
+        response = self.client.get(
+            "/api/v1/states?limit=2&cursor=" + self.ids[1])
+        self.assertEqual([obj["id"] for obj in response.get_json()],
+                         self.ids[2:4])
+        response = self.client.get("/api/v1/states?cursor=" + self.ids[3])
+        self.assertEqual([obj["id"] for obj in response.get_json()],
+                         self.ids[4:])
+        self.assertNotIn("Link", response.headers)
+        self.assertNotIn("X-Next-Cursor", response.headers)
+
+    def test_link(self):
+        """Test that following the Link headers lists every object once"""
+        self.assertEqual(self.walk("/api/v1/states?limit=2"), (self.ids, 3))
+        self.assertEqual(self.walk("/api/v1/states?limit=5"), (self.ids, 1))
+
+    def test_nested(self):
+        """Test that the cities of a state are paged too"""
+        url = "/states/{}/cities".format(self.states[0]["id"])
+        cities = sorted(self.post(url, {"name": str(i)})["id"]
+                        for i in range(3))
+        self.post("/states/{}/cities".format(self.states[1]["id"]),
+                  {"name": "other"})
+        self.assertEqual(self.walk("/api/v1" + url + "?limit=2"),
+                         (cities, 2))
+
+    def test_bad_limit(self):
+        """Test that a limit that is not a positive integer is refused"""
+        for limit in ("0", "-1", "x"):
+            with self.subTest(limit=limit):
+                response = self.client.get("/api/v1/states?limit=" + limit)
+                self.assertEqual(response.status_code, 400)
+
+    def test_max_limit(self):
+        """Test that limit is capped at max_limit"""
+        with mock.patch.object(paging, "max_limit", 3):
+            self.assertEqual(self.walk("/api/v1/states?limit=100"),
+                             (self.ids, 2))
+
+    def test_page_size(self):
+        """Test that HBNB_API_PAGE_SIZE pages the bare collections"""
+        self.assertGreater(paging.page_size, 0)
+        self.assertLessEqual(paging.page_size, paging.max_limit)
+        self.assertEqual(self.walk("/api/v1/states"), (self.ids, 1))
+        with mock.patch.object(paging, "page_size", 2):
+            self.assertEqual(self.walk("/api/v1/states"), (self.ids, 3))
+        with mock.patch.object(paging, "page_size", 2), \
+                mock.patch.object(paging, "max_limit", 1):
+            self.assertEqual(self.walk("/api/v1/states"), (self.ids, 5))
+        with mock.patch.object(paging, "page_size", 0):
+            response = self.client.get("/api/v1/states")
+            self.assertEqual(len(response.get_json()), 5)
+            self.assertNotIn("Link", response.headers)
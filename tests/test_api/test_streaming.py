@@ -0,0 +1,106 @@
+#!/usr/bin/python3
+"""
+Contains the TestStreamingDocs and TestStreaming classes
+"""
+
+import inspect
+from api.v1 import cache, paging, streaming
+import json
+import models
+import pep8
+from tests.test_api import APITestCase
+import unittest
+from unittest import mock
+
+
+class TestStreamingDocs(unittest.TestCase):
+    """Tests to check the documentation and style of streaming.py"""
+
+    def test_pep8_conformance_streaming(self):
+        """Test that api/v1/streaming.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(["api/v1/streaming.py",
+                                    "tests/test_api/test_streaming.py"])
+        self.assertEqual(
+            result.total_errors, 0, "Found code style errors (and warnings)."
+        )
+
+    def test_streaming_docstrings(self):
+        """Test for the module and function docstrings"""
+        self.assertTrue(len(streaming.__doc__) >= 1)
+        for name, func in inspect.getmembers(streaming, inspect.isfunction):
+            if func.__module__ == streaming.__name__:
+                self.assertTrue(len(func.__doc__) >= 1,
+                                "{:s} needs a docstring".format(name))
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestStreaming(APITestCase):
+    """Test the streamed responses of the large collections"""
+
+    def setUp(self):
+        """create seven states, the response cache and the default
+        paging being off"""
+        super().setUp()
+        for patcher in (mock.patch.object(cache, "enabled", False),
+                        mock.patch.object(paging, "page_size", 0)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.states = [self.post("/states", {"name": str(i)})
+                       for i in range(7)]
+
+    def get(self, url, threshold, size=2):
+        """returns GET url with the stream threshold and chunk given,
+        whether it was streamed and its body"""
+        with mock.patch.object(streaming, "threshold", threshold), \
+                mock.patch.object(streaming, "chunk", size):
+            response = self.client.get(url)
+            # the length of a streamed body is not known beforehand
+            streamed = "Content-Length" not in response.headers
+            body = response.get_data()
+        self.assertEqual(response.status_code, 200)
+        return response, streamed, body
+
+    def test_stream_matches(self):
+        """Test that a streamed collection parses as the same JSON array
+        as the unstreamed one"""
+        whole, streamed, whole_body = self.get("/api/v1/states", 0)
+        self.assertFalse(streamed)
+        self.assertEqual(len(json.loads(whole_body)), 7)
+        for size in (1, 2, 7, 100):
+            with self.subTest(chunk=size):
+                response, streamed, body = self.get("/api/v1/states",
+                                                    3, size)
+                self.assertTrue(streamed)
+                self.assertEqual(response.mimetype, "application/json")
+                self.assertEqual(json.loads(body), json.loads(whole_body))
+
+    def test_stream_empty(self):
+        """Test that a streamed collection with nothing to list is []"""
+        with mock.patch.object(models.storage, "count", return_value=4), \
+                mock.patch.object(models.storage, "iterate",
+                                  return_value=iter([])):
+            response, streamed, body = self.get("/api/v1/amenities", 3)
+        self.assertTrue(streamed)
+        self.assertEqual(json.loads(body), [])
+
+    def test_paged_by_default(self):
+        """Test that the collections are paged rather than streamed with
+        the default page size"""
+        with mock.patch.object(paging, "page_size", 4):
+            response, streamed, body = self.get("/api/v1/states", 3)
+        self.assertFalse(streamed)
+        self.assertEqual(len(json.loads(body)), 4)
+        self.assertIn("X-Next-Cursor", response.headers)
+
+    def test_stream_headers(self):
+        """Test that streamed responses are neither tagged nor cached"""
+        with mock.patch.object(cache, "enabled", True):
+            for _ in range(2):
+                response, streamed, body = self.get("/api/v1/states", 3)
+                self.assertTrue(streamed)
+                self.assertIsNone(response.get_etag()[0])
+                self.assertEqual(response.headers["X-Cache"], "MISS")
+            self.assertEqual(cache.stats()["entries"], 0)
+            response, streamed, body = self.get("/api/v1/states", 0)
+            self.assertIsNotNone(response.get_etag()[0])
@@ -1,13 +1,17 @@
 #!/usr/bin/python3
 """Test BaseModel for expected behavior and documentation"""
+from copy import deepcopy
 from datetime import datetime
 import inspect
 import models
+from models.place import Place
 import pep8 as pycodestyle
+import pickle
 import time
 import unittest
 from unittest import mock
 BaseModel = models.base_model.BaseModel
+Compact = models.base_model.Compact
 module_doc = models.base_model.__doc__
 
 
@@ -158,3 +162,90 @@ class TestBaseModel(unittest.TestCase):
         self.assertEqual(old_created_at, new_created_at)
         self.assertTrue(mock_storage.new.called)
         self.assertTrue(mock_storage.save.called)
+
+
+@unittest.skipIf(models.storage_t == "db", "compact variants are file only")
+class TestCompact(unittest.TestCase):
+    """Test the compact variants of the models"""
+
+    def setUp(self):
+        """Set up a Place and its compact copy"""
+        self.place = Place(name="Home", number_rooms=3, amenity_ids=["a"])
+        self.place.nickname = "home"
+        self.compact = Compact.variant(Place).build(self.place.to_dict())
+        self.compact.created_at = self.place.created_at
+        self.compact.updated_at = self.place.updated_at
+
+    def test_variant(self):
+        """Test that the variant is a cached subclass with slots"""
+        variant = Compact.variant(Place)
+        self.assertIs(variant, Compact.variant(Place))
+        self.assertTrue(issubclass(variant, Place))
+        self.assertEqual(variant.__name__, "Place")
+        self.assertEqual(variant.__qualname__, "CompactPlace")
+        self.assertIn("number_rooms", variant.__slots__)
+        place = variant(name="Flat")
+        self.assertEqual(place.to_dict()["name"], "Flat")
+        self.assertEqual(place.max_guest, 0)
+
+    def test_attributes(self):
+        """Test that the attributes match the ones of the original"""
+        self.assertEqual(self.compact.__dict__, self.place.__dict__)
+        self.assertEqual(self.compact.to_dict(), self.place.to_dict())
+        self.assertEqual(str(self.compact), "[Place] ({}) {}".format(
+            self.place.id, self.compact.__dict__))
+        self.assertEqual(self.compact.nickname, "home")
+        self.assertEqual(self.compact.max_guest, 0)
+        self.assertNotIn("max_guest", self.compact.to_dict())
+        with self.assertRaises(AttributeError):
+            self.compact.missing
+
+    def test_set_and_delete_attributes(self):
+        """Test that attributes can be set and deleted"""
+        self.compact.max_guest = 4
+        self.compact.color = "blue"
+        self.assertEqual(self.compact.to_dict()["max_guest"], 4)
+        self.assertEqual(self.compact.to_dict()["color"], "blue")
+        del self.compact.color
+        del self.compact.max_guest
+        self.assertNotIn("color", self.compact.__dict__)
+        self.assertEqual(self.compact.max_guest, 0)
+
+    def test_dict_is_read_only(self):
+        """Test that writes to __dict__ raise instead of being lost"""
+        attrs = self.compact.__dict__
+        for write in (lambda: attrs.__setitem__("name", "Flat"),
+                      lambda: attrs.update(name="Flat"),
+                      lambda: attrs.pop("name"),
+                      lambda: attrs.setdefault("color", "blue"),
+                      attrs.clear):
+            with self.assertRaises(TypeError):
+                write()
+        with self.assertRaises(AttributeError):
+            self.compact.__dict__ = {}
+        self.assertEqual(self.compact.name, "Home")
+        self.assertEqual(self.compact.to_dict(), self.place.to_dict())
+        copy = vars(self.compact).copy()
+        copy["name"] = "Flat"
+        self.assertEqual(self.compact.name, "Home")
+
+    def test_pickle(self):
+        """Test that compact objects pickle and copy as the same variant"""
+        for copy in (pickle.loads(pickle.dumps(self.compact)),
+                     deepcopy(self.compact)):
+            self.assertIsNot(copy, self.compact)
+            self.assertIs(type(copy), Compact.variant(Place))
+            self.assertEqual(copy.__dict__, self.compact.__dict__)
+            self.assertEqual(copy.max_guest, 0)
+            self.assertNotIn("max_guest", copy.to_dict())
+
+    @mock.patch('models.storage')
+    def test_save_and_delete(self, mock_storage):
+        """Test that save and delete go through storage"""
+        updated_at = self.compact.updated_at
+        self.compact.save()
+        self.assertNotEqual(self.compact.updated_at, updated_at)
+        mock_storage.new.assert_called_with(self.compact)
+        self.assertTrue(mock_storage.save.called)
+        self.compact.delete()
+        mock_storage.delete.assert_called_with(self.compact)
@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+"""
+Contains the TestConvertDocs and TestConvert classes
+"""
+
+import json
+from models.engine import convert
+from models.engine.file_storage import PackedFormat
+from models.state import State
+import os
+import pep8
+import unittest
+
+
+class TestConvertDocs(unittest.TestCase):
+    """Tests to check the documentation and style of convert.py"""
+
+    def test_pep8_conformance_convert(self):
+        """Test that models/engine/convert.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(["models/engine/convert.py",
+                                    "tests/test_models/test_engine/"
+                                    "test_convert.py"])
+        self.assertEqual(
+            result.total_errors, 0, "Found code style errors (and warnings)."
+        )
+
+    def test_convert_docstrings(self):
+        """Test for the module and function docstrings"""
+        self.assertTrue(len(convert.__doc__) >= 1)
+        self.assertTrue(len(convert.convert.__doc__) >= 1)
+
+
+class TestConvert(unittest.TestCase):
+    """Test converting files between formats"""
+
+    paths = ("convert_test.json", "convert_test.packed", "convert_back.json",
+             "convert_test.json.log")
+
+    def tearDown(self):
+        """remove the converted files"""
+        for path in self.paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_round_trip(self):
+        """Test that json to packed to json keeps every object"""
+        objects = {}
+        for i in range(3):
+            state = State(name="State {}".format(i))
+            objects["State." + state.id] = state.to_dict()
+        with open(self.paths[0], "w") as f:
+            json.dump(objects, f)
+        self.assertEqual(
+            convert.convert(self.paths[0], self.paths[1], "packed"), 3)
+        with open(self.paths[1], "rb") as f:
+            self.assertTrue(f.read().startswith(PackedFormat.magic))
+        self.assertEqual(
+            convert.convert(self.paths[1], self.paths[2], "json"), 3)
+        with open(self.paths[2]) as f:
+            self.assertEqual(json.load(f), objects)
+
+    def test_refuses_journal(self):
+        """Test that a source with a journal is not converted"""
+        with open(self.paths[0], "w") as f:
+            json.dump({}, f)
+        with open(self.paths[3], "w") as f:
+            f.write("{}\n")
+        with self.assertRaises(ValueError):
+            convert.convert(self.paths[0], self.paths[1], "packed")
+        self.assertFalse(os.path.exists(self.paths[1]))
@@ -3,12 +3,14 @@
 Contains the TestDBStorageDocs and TestDBStorage classes
 """
 
+from contextlib import contextmanager
 from datetime import datetime
 import inspect
+import itertools
 import models
 from models.engine import db_storage
 from models.amenity import Amenity
-from models.base_model import BaseModel
+from models.base_model import Base, BaseModel
 from models.city import City
 from models.place import Place
 from models.review import Review
@@ -17,9 +19,15 @@ from models.user import User
 import json
 import os
 import pep8
+from sqlalchemy import create_engine, event, inspect as inspect_db, \
+    update
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool, SingletonThreadPool
 import unittest
+from unittest import mock
 
 DBStorage = db_storage.DBStorage
+ReplicaSession = db_storage.ReplicaSession
 classes = {
     "Amenity": Amenity,
     "City": City,
@@ -30,6 +38,22 @@ classes = {
 }
 
 
+@contextmanager
+def executed(storage):
+    """collects the statements storage runs in the with block"""
+    statements = []
+
+    def collect(conn, cursor, statement, parameters, context, many):
+        """records a statement"""
+        statements.append(statement)
+    engine = storage._DBStorage__engine
+    event.listen(engine, "before_cursor_execute", collect)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", collect)
+
+
 class TestDBStorageDocs(unittest.TestCase):
     """Tests to check the documentation and style of DBStorage class"""
 
@@ -178,3 +202,257 @@ class TestDBStorage(unittest.TestCase):
         count = self.storage.count(User)
         # Check that the count is 1 since we added one User object
         self.assertGreater(count, 0)
+
+    @unittest.skipIf(models.storage_t != "db", "not testing database storage")
+    def test_get_by_name_and_missing(self):
+        """Test get with a class name and with ids that do not exist"""
+        self.assertIs(self.storage.get("City", self.city.id), self.city)
+        self.assertIsNone(self.storage.get(City, "does-not-exist"))
+        self.assertIsNone(self.storage.get("NotAClass", self.city.id))
+
+    @unittest.skipIf(models.storage_t != "db", "not testing database storage")
+    def test_count_matches_all(self):
+        """Test that count agrees with the number of rows all returns"""
+        for name, cls in classes.items():
+            with self.subTest(cls=name):
+                self.assertEqual(self.storage.count(cls),
+                                 len(self.storage.all(cls)))
+                self.assertEqual(self.storage.count(name),
+                                 len(self.storage.all(cls)))
+        self.assertEqual(self.storage.count(), len(self.storage.all()))
+
+    @unittest.skipIf(models.storage_t != "db", "not testing database storage")
+    def test_generation(self):
+        """Test that generation changes with the rows of its class"""
+        before = (self.storage.generation(City),
+                  self.storage.generation("State"))
+        self.city.name = "Renamed"
+        self.storage.save()
+        self.assertGreater(self.storage.generation("City"), before[0])
+        self.assertEqual(self.storage.generation(State), before[1])
+
+    @unittest.skipIf(models.storage_t != "db", "not testing database storage")
+    def test_iterate(self):
+        """Test that iterate yields the rows all returns"""
+        for name, cls in classes.items():
+            with self.subTest(cls=name):
+                self.assertCountEqual(self.storage.iterate(name),
+                                      self.storage.all(cls).values())
+        self.assertCountEqual(self.storage.iterate(),
+                              self.storage.all().values())
+
+    @unittest.skipIf(models.storage_t != "db", "not testing database storage")
+    def test_search_places(self):
+        """Test that search_places filters on location and amenities"""
+        amenity = Amenity(name="Wifi")
+        self.storage.new(amenity)
+        self.place.amenities.append(amenity)
+        self.storage.save()
+        self.assertIn(self.place,
+                      self.storage.search_places(states=[self.state.id]))
+        self.assertIn(self.place,
+                      self.storage.search_places(cities=[self.city.id]))
+        self.assertEqual(self.storage.search_places(amenities=[amenity.id]),
+                         [self.place])
+        self.assertEqual(self.storage.search_places(
+            cities=[self.city.id], amenities=[amenity.id, "missing"]), [])
+        self.assertEqual(self.storage.search_places(states=["missing"]), [])
+
+    @unittest.skipIf(models.storage_t != "db", "not testing database storage")
+    def test_search_places_ranges(self):
+        """Test that search_places filters on column ranges"""
+        self.place.price_by_night = 80
+        self.storage.save()
+        cities = [self.city.id]
+        self.assertEqual(self.storage.search_places(
+            cities=cities, ranges={"price_by_night": (80, 80)}), [self.place])
+        self.assertEqual(self.storage.search_places(
+            cities=cities, ranges={"price_by_night": (None, 79)}), [])
+        self.assertEqual(self.storage.search_places(
+            cities=cities, ranges={"price_by_night": (81, None)}), [])
+
+    @unittest.skipIf(models.storage_t != "db", "not testing database storage")
+    def test_places_nearby(self):
+        """Test that places_nearby finds places around a point"""
+        self.place.latitude, self.place.longitude = -89.9, 0.5
+        self.storage.save()
+        self.assertEqual(self.storage.places_nearby(-89.9, 0.4, radius=5),
+                         [self.place])
+        self.assertEqual(self.storage.places_nearby(-89.9, 0.4, k=1),
+                         [self.place])
+        self.assertEqual(self.storage.places_nearby(0, 0, radius=5), [])
+
+    @unittest.skipIf(models.storage_t != "db", "not testing database storage")
+    def test_search_text(self):
+        """Test that search_text finds places by the words of their text
+        and follows the commits of save()"""
+        self.assertEqual(self.storage.search_text(Place, "zxqv"), [])
+        self.place.description = "A zxqv loft"
+        self.storage.save()
+        self.assertEqual(self.storage.search_text(Place, "ZXQV loft"),
+                         [self.place])
+        self.assertEqual(self.storage.search_text(City, "zxqv"), [])
+
+    @unittest.skipIf(models.storage_t != "db", "not testing database storage")
+    def test_search_text_autoflush(self):
+        """Test that search_text follows the changes a query flushed
+        before save() committed them, and not those rolled back"""
+        self.storage.search_text(Place, "zxqz")
+        self.place.description = "zxqz barn"
+        self.assertIn(self.place, self.storage.all(Place).values())
+        self.assertFalse(self.storage._DBStorage__session.dirty)
+        self.storage.save()
+        self.assertEqual(self.storage.search_text(Place, "zxqz"),
+                         [self.place])
+        self.place.description = "zxqk barn"
+        self.storage.all(Place)
+        self.storage._DBStorage__session.rollback()
+        self.assertEqual(self.storage.search_text(Place, "zxqk"), [])
+        self.assertEqual(self.storage.search_text(Place, "zxqz"),
+                         [self.place])
+
+    @unittest.skipIf(models.storage_t != "db", "not testing database storage")
+    def test_search_text_ttl(self):
+        """Test that the text index is rebuilt after HBNB_MYSQL_TEXT_TTL,
+        so that it sees the rows written by other processes"""
+        self.storage.search_text(Place, "zxqw")
+        with self.storage._DBStorage__engine.begin() as connection:
+            connection.execute(update(Place).where(
+                Place.id == self.place.id).values(description="zxqw"))
+        self.storage.save()
+        self.assertEqual(self.storage.search_text(Place, "zxqw"), [])
+        with mock.patch.object(db_storage, "text_ttl", 0):
+            found = self.storage.search_text(Place, "zxqw")
+        self.assertEqual([place.id for place in found], [self.place.id])
+        self.assertEqual(len(self.storage.search_text(Place, "zxqw")), 1)
+
+    @unittest.skipIf(models.storage_t != "db", "not testing database storage")
+    def test_all_load(self):
+        """Test that all and get load relationships in a query per level,
+        however many rows there are"""
+        states = [State(name="S{}".format(i)) for i in range(3)]
+        for state in states:
+            self.storage.new(state)
+        self.storage.save()
+        for state in states:
+            for i in range(2):
+                self.storage.new(City(name="C", state_id=state.id))
+        self.storage.save()
+        with executed(self.storage) as statements:
+            objs = self.storage.all(State, load=["cities.places"])
+            for state in states:
+                self.assertEqual(len(state.cities), 2)
+                for city in state.cities:
+                    self.assertEqual(city.places, [])
+        self.assertIn(states[0], objs.values())
+        self.assertEqual(len(statements), 3)
+        self.assertNotIn("cities", states[0].to_dict())
+        city = City(name="C", state_id=states[0].id)
+        self.storage.new(city)
+        self.storage.save()
+        with executed(self.storage) as statements:
+            self.storage.get(City, city.id, load=["places", "state"])
+            self.assertEqual(city.places, [])
+            self.assertIs(city.state, states[0])
+        self.assertLessEqual(len(statements), 2)
+        with self.assertRaises(ValueError):
+            self.storage.all(State, load=["places"])
+
+    @unittest.skipIf(models.storage_t != "db", "not testing database storage")
+    def test_pool_stats(self):
+        """Test that pool_stats counts the checkouts of the pool"""
+        before = self.storage.pool_stats()
+        self.assertGreaterEqual(before["connects"], 1)
+        with self.storage._DBStorage__engine.connect():
+            stats = self.storage.pool_stats()
+            self.assertEqual(stats["checkouts"], before["checkouts"] + 1)
+            self.assertEqual(stats["checked_out"],
+                             before["checked_out"] + 1)
+        self.assertEqual(self.storage.pool_stats()["checked_out"],
+                         before["checked_out"])
+
+    @unittest.skipIf(models.storage_t != "db", "not testing database storage")
+    def test_pool_options(self):
+        """Test that the pool sizes only go to a QueuePool, so that an
+        in-memory SQLite database connects"""
+        connect = self.storage._DBStorage__connect
+        env = {"HBNB_MYSQL_POOL_SIZE": "3", "HBNB_MYSQL_POOL_TIMEOUT": "2"}
+        with mock.patch.dict(os.environ, env):
+            memory = connect("sqlite://")
+            queued = connect("sqlite:///" + os.devnull)
+        self.assertIsInstance(memory.pool, SingletonThreadPool)
+        with memory.connect() as connection:
+            self.assertEqual(connection.exec_driver_sql("SELECT 1").scalar(),
+                             1)
+        self.assertIsInstance(queued.pool, QueuePool)
+        self.assertEqual(queued.pool.size(), 3)
+        self.assertEqual(queued.pool.timeout(), 2)
+        stats = self.storage._DBStorage__pool_stats(memory)
+        self.assertEqual(stats["checkouts"], 1)
+        self.assertNotIn("size", stats)
+        for engine in (memory, queued):
+            engine.dispose()
+
+    @unittest.skipIf(models.storage_t != "db", "not testing database storage")
+    def test_replica_session(self):
+        """Test that a ReplicaSession reads from its replicas in turn until
+        it writes, and from the primary after"""
+        primary = create_engine("sqlite://")
+        replicas = [create_engine("sqlite://") for i in range(2)]
+        for i, engine in enumerate([primary] + replicas):
+            Base.metadata.create_all(engine)
+            with Session(bind=engine) as session:
+                session.add(State(name="S{}".format(i)))
+                session.commit()
+        cycle = itertools.cycle(replicas)
+        session = ReplicaSession(bind=primary, replicas=cycle,
+                                 expire_on_commit=False)
+        self.assertEqual([state.name for state in session.query(State)],
+                         ["S1"])
+        self.assertEqual(session.query(State).count(), 1)
+        other = ReplicaSession(bind=primary, replicas=cycle)
+        self.assertEqual(other.query(State).one().name, "S2")
+        other.close()
+        session.add(State(name="P"))
+        self.assertEqual(sorted(state.name for state in
+                                session.query(State)), ["P", "S0"])
+        session.commit()
+        self.assertEqual(session.query(State).count(), 2)
+        session.close()
+
+    @unittest.skipIf(models.storage_t != "db", "not testing database storage")
+    def test_foreign_key_indexes(self):
+        """Test that the foreign keys looked up by the relationships are
+        indexed"""
+        engine = self.storage._DBStorage__engine
+        for table, column in (("cities", "state_id"), ("places", "city_id"),
+                              ("places", "user_id"), ("reviews", "place_id"),
+                              ("reviews", "user_id"),
+                              ("place_amenity", "amenity_id")):
+            with self.subTest(table=table, column=column):
+                indexes = inspect_db(engine).get_indexes(table)
+                self.assertIn([column], [index["column_names"]
+                                         for index in indexes])
+
+    @unittest.skipIf(os.getenv("HBNB_TYPE_STORAGE") != "sqlite",
+                     "not testing the SQLite database storage")
+    def test_sqlite_pragmas(self):
+        """Test that SQLite connections are in WAL mode and enforce
+        foreign keys"""
+        engine = self.storage._DBStorage__engine
+        with engine.connect() as connection:
+            self.assertEqual(connection.exec_driver_sql(
+                "PRAGMA journal_mode").scalar(), "wal")
+            self.assertEqual(connection.exec_driver_sql(
+                "PRAGMA foreign_keys").scalar(), 1)
+
+    @unittest.skipIf(models.storage_t != "db", "not testing database storage")
+    def test_page(self):
+        """Test that page walks the rows of a class in id order"""
+        ids = sorted(city.id for city in self.storage.all(City).values())
+        page = self.storage.page(City, len(ids))
+        self.assertEqual([city.id for city in page], ids)
+        self.assertEqual(self.storage.page(City, 1, ids[-1]), [])
+        page = self.storage.page(City, 10, None, "state_id", self.state.id)
+        self.assertIn(self.city, page)
+        self.assertEqual(self.storage.page("NotAClass", 10), [])
@@ -8,7 +8,7 @@ import inspect
 import models
 from models.engine import file_storage
 from models.amenity import Amenity
-from models.base_model import BaseModel
+from models.base_model import BaseModel, Compact
 from models.city import City
 from models.place import Place
 from models.review import Review
@@ -17,7 +17,11 @@ from models.user import User
 import json
 import os
 import pep8
+import pickle
+import struct
+import time
 import unittest
+from unittest import mock
 
 FileStorage = file_storage.FileStorage
 classes = {
@@ -178,3 +182,946 @@ class TestFileStorage(unittest.TestCase):
 
         # Assert that the count is 1 since we added one object
         self.assertGreater(count, 0)
+
+    @unittest.skipIf(models.storage_t == "db", "not testing file storage")
+    def test_all_cls_only_returns_that_class(self):
+        """Test that all(cls) returns only objects of cls"""
+        storage = FileStorage()
+        state = State()
+        city = City()
+        storage.new(state)
+        storage.new(city)
+        for cls in (State, "State"):
+            with self.subTest(cls=cls):
+                states = storage.all(cls)
+                self.assertIn("State." + state.id, states)
+                self.assertNotIn("City." + city.id, states)
+                for obj in states.values():
+                    self.assertIs(type(obj), State)
+
+    @unittest.skipIf(models.storage_t == "db", "not testing file storage")
+    def test_delete_updates_class_index(self):
+        """Test that delete removes the object from all(cls) and count"""
+        storage = FileStorage()
+        amenity = Amenity()
+        storage.new(amenity)
+        count = storage.count(Amenity)
+        self.assertIn("Amenity." + amenity.id, storage.all(Amenity))
+        storage.delete(amenity)
+        self.assertNotIn("Amenity." + amenity.id, storage.all(Amenity))
+        self.assertEqual(storage.count("Amenity"), count - 1)
+
+    @unittest.skipIf(models.storage_t == "db", "not testing file storage")
+    def test_class_index_follows_objects_replacement(self):
+        """Test that all(cls) reflects a replaced __objects dictionary"""
+        storage = FileStorage()
+        user = User()
+        save = FileStorage._FileStorage__objects
+        FileStorage._FileStorage__objects = {"User." + user.id: user}
+        self.assertEqual(storage.all(User), {"User." + user.id: user})
+        self.assertEqual(storage.count(User), 1)
+        self.assertEqual(storage.count(), 1)
+        FileStorage._FileStorage__objects = save
+        self.assertNotIn("User." + user.id, storage.all(User))
+
+    @unittest.skipIf(models.storage_t == "db", "not testing file storage")
+    def test_related(self):
+        """Test that related returns the objects with a foreign key value"""
+        storage = FileStorage()
+        state = State()
+        city = City(state_id=state.id)
+        other = City(state_id="other")
+        storage.new(state)
+        storage.new(city)
+        storage.new(other)
+        self.assertEqual(storage.related(City, "state_id", state.id), [city])
+        self.assertEqual(storage.related("City", "state_id", state.id),
+                         [city])
+        storage.delete(city)
+        self.assertEqual(storage.related(City, "state_id", state.id), [])
+
+    @unittest.skipIf(models.storage_t == "db", "not testing file storage")
+    def test_related_follows_attribute_change(self):
+        """Test that new reindexes an object whose foreign key changed"""
+        storage = FileStorage()
+        review = Review(place_id="first")
+        storage.new(review)
+        review.place_id = "second"
+        storage.new(review)
+        self.assertEqual(storage.related(Review, "place_id", "first"), [])
+        self.assertEqual(storage.related(Review, "place_id", "second"),
+                         [review])
+
+    @unittest.skipIf(models.storage_t == "db", "not testing file storage")
+    def test_indexes_follow_setattr(self):
+        """Test that setting an indexed attribute of a stored object
+        re-indexes it without new() or save()"""
+        storage = FileStorage()
+        states = [State(), State()]
+        city = City(state_id=states[0].id)
+        place = Place(city_id=city.id, price_by_night=50, latitude=10.0,
+                      longitude=10.0, description="quiet zxqy flat")
+        for obj in states + [city, place]:
+            storage.new(obj)
+        self.assertEqual(states[0].cities, [city])
+        self.assertEqual(storage.places_nearby(10, 10, 5), [place])
+        self.assertEqual(storage.search_text(Place, "zxqy"), [place])
+        ranges = {"price_by_night": (100, None)}
+        self.assertEqual(storage.search_places([], [city.id], [], ranges),
+                         [])
+        generation = storage.generation(City)
+        city.state_id = states[1].id
+        self.assertGreater(storage.generation(City), generation)
+        self.assertEqual(states[0].cities, [])
+        self.assertEqual(states[1].cities, [city])
+        self.assertEqual(storage.related(City, "state_id", states[1].id),
+                         [city])
+        place.price_by_night = 150
+        place.latitude = -10.0
+        place.description = "noisy street"
+        self.assertEqual(storage.search_places([], [city.id], [], ranges),
+                         [place])
+        self.assertEqual(storage.places_nearby(10, 10, 5), [])
+        self.assertEqual(storage.places_nearby(-10, 10, 5), [place])
+        self.assertEqual(storage.search_text(Place, "zxqy"), [])
+        del place.city_id
+        self.assertEqual(storage.related(Place, "city_id", city.id), [])
+        unstored = City(state_id=states[0].id)
+        unstored.state_id = states[1].id
+        self.assertEqual(states[1].cities, [city])
+        for obj in states + [city, place]:
+            storage.delete(obj)
+
+    @unittest.skipIf(models.storage_t == "db", "not testing file storage")
+    def test_count_matches_all(self):
+        """Test that count agrees with the number of objects all returns"""
+        storage = FileStorage()
+        storage.new(Place())
+        for name, cls in classes.items():
+            with self.subTest(cls=name):
+                self.assertEqual(storage.count(cls), len(storage.all(cls)))
+                self.assertEqual(storage.count(name), len(storage.all(cls)))
+        self.assertEqual(storage.count(), len(storage.all()))
+
+    @unittest.skipIf(models.storage_t == "db", "not testing file storage")
+    def test_generation(self):
+        """Test that generation changes with the objects of its class"""
+        storage = FileStorage()
+        state = State()
+        before = (storage.generation(State), storage.generation("City"))
+        storage.new(state)
+        self.assertGreater(storage.generation(State), before[0])
+        self.assertEqual(storage.generation("City"), before[1])
+        generation = storage.generation("State")
+        storage.delete(state)
+        self.assertGreater(storage.generation(State), generation)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_search_places(self):
+        """Test that search_places filters on location and amenities"""
+        storage = FileStorage()
+        state = State()
+        cities = [City(state_id=state.id), City(state_id="other")]
+        amenities = [Amenity(), Amenity()]
+        places = [Place(city_id=cities[0].id),
+                  Place(city_id=cities[0].id,
+                        amenity_ids=[amenities[0].id]),
+                  Place(city_id=cities[1].id,
+                        amenity_ids=[amenity.id for amenity in amenities])]
+        for obj in cities + places:
+            storage.new(obj)
+        ids = [amenity.id for amenity in amenities]
+        self.assertEqual(storage.search_places(states=[state.id]),
+                         sorted(places[:2], key=lambda place: place.id))
+        self.assertEqual(storage.search_places(amenities=ids), [places[2]])
+        self.assertEqual(storage.search_places([state.id], [cities[1].id],
+                                               [ids[0]]),
+                         sorted(places[1:], key=lambda place: place.id))
+        self.assertEqual(storage.search_places(cities=[cities[1].id],
+                                               amenities=["missing"]), [])
+        places[2].amenity_ids = [ids[0]]
+        storage.new(places[2])
+        self.assertEqual(storage.search_places(amenities=ids), [])
+        for obj in cities + places:
+            storage.delete(obj)
+        self.assertEqual(storage.search_places(amenities=[ids[0]]), [])
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_search_places_ranges(self):
+        """Test that search_places filters on ranked attribute ranges"""
+        storage = FileStorage()
+        city = City()
+        places = [Place(city_id=city.id, price_by_night=price, max_guest=2)
+                  for price in (50, 100, 150)]
+        for place in places:
+            storage.new(place)
+        ranges = {"price_by_night": (60, None), "max_guest": (2, 2)}
+        self.assertEqual(storage.search_places([], [city.id], [], ranges),
+                         sorted(places[1:], key=lambda place: place.id))
+        ranges = {"price_by_night": (None, 100)}
+        self.assertEqual(storage.search_places([], [city.id], [], ranges),
+                         sorted(places[:2], key=lambda place: place.id))
+        places[0].price_by_night = 500
+        storage.new(places[0])
+        storage.delete(places[1])
+        self.assertEqual(storage.search_places([], [city.id], [], ranges),
+                         [])
+        ranges = {"price_by_night": (120, 1000)}
+        self.assertEqual(storage.search_places([], [city.id], [], ranges),
+                         sorted([places[0], places[2]],
+                                key=lambda place: place.id))
+        for place in places:
+            storage.delete(place)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_places_nearby(self):
+        """Test that places_nearby follows the places as they move"""
+        storage = FileStorage()
+        places = [Place(latitude=-33.9, longitude=151.2),
+                  Place(latitude=-33.8, longitude=151.3),
+                  Place(latitude=51.5, longitude=-0.1)]
+        for place in places:
+            storage.new(place)
+        self.assertEqual(storage.places_nearby(-33.85, 151.21, radius=50),
+                         places[:2])
+        self.assertEqual(storage.places_nearby(51.4, 0, k=1), [places[2]])
+        places[2].latitude, places[2].longitude = -33.9, 151.25
+        storage.new(places[2])
+        storage.delete(places[0])
+        self.assertEqual(storage.places_nearby(-33.9, 151.2, 50, 2),
+                         [places[2], places[1]])
+        self.assertEqual(storage.places_nearby(51.5, -0.1, radius=50), [])
+        for place in places:
+            storage.delete(place)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_search_text(self):
+        """Test that search_text ranks the texts holding the query words
+        and follows their updates"""
+        storage = FileStorage()
+        reviews = [Review(text="Quiet flat, zxqv garden"),
+                   Review(text="zxqv zxqv zxqv"),
+                   Review(text="Noisy street")]
+        for review in reviews:
+            storage.new(review)
+        self.assertEqual(storage.search_text(Review, "ZXQV"),
+                         [reviews[1], reviews[0]])
+        self.assertEqual(storage.search_text("Review", "zxqv", 1),
+                         [reviews[1]])
+        reviews[2].text = "a zxqv street"
+        storage.new(reviews[2])
+        storage.delete(reviews[1])
+        self.assertEqual(set(storage.search_text(Review, "zxqv garden")),
+                         {reviews[0], reviews[2]})
+        self.assertEqual(storage.search_text(Review, "garden zxqv")[0],
+                         reviews[0])
+        self.assertEqual(storage.search_text(City, "zxqv"), [])
+        for review in reviews:
+            storage.delete(review)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_all_load(self):
+        """Test that all and get accept the load of DBStorage"""
+        storage = FileStorage()
+        state = State()
+        storage.new(state)
+        self.assertEqual(storage.all(State, load=["cities"]),
+                         storage.all(State))
+        self.assertIs(storage.get(State, state.id, load=["cities"]), state)
+        storage.delete(state)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_pool_stats(self):
+        """Test that there is no connection pool with the file storage"""
+        self.assertEqual(FileStorage().pool_stats(), {})
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_page(self):
+        """Test that page walks the objects of a class in id order"""
+        storage = FileStorage()
+        state = State()
+        cities = [City(state_id=state.id) for i in range(5)]
+        for city in cities:
+            storage.new(city)
+        ids = sorted(city.id for city in cities)
+        page = storage.page(City, 2, None, "state_id", state.id)
+        self.assertEqual([city.id for city in page], ids[:2])
+        page = storage.page("City", 10, ids[1], "state_id", state.id)
+        self.assertEqual([city.id for city in page], ids[2:])
+        storage.delete(cities[0])
+        city = City(state_id=state.id)
+        storage.new(city)
+        ids = sorted(set(ids + [city.id]) - {cities[0].id})
+        page = storage.page(City, 10, None, "state_id", state.id)
+        self.assertEqual([city.id for city in page], ids)
+        all_ids = sorted(obj.id for obj in storage.all(City).values())
+        page = storage.page(City, len(all_ids))
+        self.assertEqual([city.id for city in page], all_ids)
+        self.assertEqual(storage.page(City, 3, all_ids[-1]), [])
+        for city in page:
+            if city.state_id == state.id:
+                storage.delete(city)
+
+
+class ScratchFileStorageTest(unittest.TestCase):
+    """Base for tests running a FileStorage against a scratch file"""
+
+    env = {}
+
+    def setUp(self):
+        """isolate the stored objects and use a scratch file"""
+        self.saved = FileStorage._FileStorage__objects
+        FileStorage._FileStorage__objects = {}
+        self.path = "file_scratch_test.json"
+        with mock.patch.dict(os.environ, self.env):
+            self.storage = self.new_storage()
+
+    def tearDown(self):
+        """restore the stored objects and remove the scratch files"""
+        FileStorage._FileStorage__objects = self.saved
+        FileStorage._FileStorage__dirty.clear()
+        for path in (self.path, self.path + ".log"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def new_storage(self):
+        """returns a FileStorage writing to the scratch file"""
+        storage = FileStorage()
+        storage._FileStorage__file_path = self.path
+        return storage
+
+    def reloaded(self):
+        """returns the objects a fresh reload finds on disk"""
+        FileStorage._FileStorage__objects = {}
+        with mock.patch.dict(os.environ, self.env):
+            storage = self.new_storage()
+        storage.reload()
+        return storage
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestFileStorageJournal(ScratchFileStorageTest):
+    """Test the journaled save mode of the FileStorage class"""
+
+    env = {"HBNB_FILE_SAVE": "journal"}
+
+    def test_save_appends_only_changes(self):
+        """Test that save appends one journal line per save"""
+        state = State(name="Lagos")
+        self.storage.new(state)
+        self.storage.save()
+        self.storage.new(City(state_id=state.id))
+        self.storage.save()
+        self.assertFalse(os.path.exists(self.path))
+        with open(self.path + ".log") as f:
+            lines = f.readlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(list(json.loads(lines[0])), ["State." + state.id])
+
+    def test_reload_replays_journal(self):
+        """Test that reload applies puts and deletes from the journal"""
+        state = State(name="Lagos")
+        city = City(state_id=state.id)
+        self.storage.new(state)
+        self.storage.new(city)
+        self.storage.save()
+        state.name = "Abuja"
+        self.storage.new(state)
+        self.storage.delete(city)
+        self.storage.save()
+        storage = self.reloaded()
+        self.assertEqual(storage.get(State, state.id).name, "Abuja")
+        self.assertIsNone(storage.get(City, city.id))
+
+    def test_compact(self):
+        """Test that compact folds the journal into the JSON file"""
+        state = State(name="Lagos")
+        self.storage.new(state)
+        self.storage.save()
+        self.storage.compact()
+        self.assertFalse(os.path.exists(self.path + ".log"))
+        self.assertIn("State." + state.id, self.reloaded().all())
+
+    def test_journal_after_compact(self):
+        """Test that a journal started on a snapshot names its token and
+        is replayed over it"""
+        state = State(name="Lagos")
+        self.storage.new(state)
+        self.storage.compact()
+        state.name = "Abuja"
+        self.storage.new(state)
+        self.storage.save()
+        with open(self.path) as f:
+            token = json.load(f)[file_storage.snapshot_key]["token"]
+        with open(self.path + ".log") as f:
+            self.assertEqual(json.loads(f.readline()),
+                             {"__journal__": token})
+        storage = self.reloaded()
+        self.assertEqual(storage.get(State, state.id).name, "Abuja")
+        self.assertNotIn(file_storage.snapshot_key, storage.all())
+        self.assertEqual(storage.count(), 1)
+
+    def test_crash_before_journal_removed(self):
+        """Test that a journal left behind by a crash between writing the
+        snapshot and removing the journal is not replayed over it"""
+        state = State(name="Lagos")
+        self.storage.new(state)
+        self.storage.compact()
+        state.name = "Abuja"
+        self.storage.new(state)
+        self.storage.save()
+        with open(self.path + ".log") as f:
+            journal = f.read()
+        state.name = "Kano"
+        self.storage.new(state)
+        self.storage.compact()
+        with open(self.path + ".log", "w") as f:
+            f.write(journal)
+        self.assertEqual(self.reloaded().get(State, state.id).name, "Kano")
+        self.assertFalse(os.path.exists(self.path + ".log"))
+
+    def test_compact_every(self):
+        """Test that the journal is compacted after HBNB_FILE_COMPACT saves"""
+        env = {"HBNB_FILE_SAVE": "journal", "HBNB_FILE_COMPACT": "2"}
+        with mock.patch.dict(os.environ, env):
+            storage = self.new_storage()
+        storage.new(State())
+        storage.save()
+        self.assertTrue(os.path.exists(self.path + ".log"))
+        storage.new(State())
+        storage.save()
+        self.assertFalse(os.path.exists(self.path + ".log"))
+        self.assertEqual(self.reloaded().count(State), 2)
+
+    def test_torn_journal_line(self):
+        """Test that a save cut short by a crash is dropped on reload"""
+        state = State(name="Lagos")
+        self.storage.new(state)
+        self.storage.save()
+        with open(self.path + ".log", "a") as f:
+            f.write('{"State.torn": {"__class__": "State", "na')
+        storage = self.reloaded()
+        self.assertEqual(storage.count(State), 1)
+        self.assertIn("State." + state.id, storage.all())
+        with open(self.path + ".log") as f:
+            self.assertEqual(len(f.readlines()), 1)
+        storage.new(City())
+        storage.save()
+        self.assertEqual(self.reloaded().count(), 2)
+
+    def test_crash_between_snapshot_and_journal_removal(self):
+        """Test that replaying an already compacted journal is harmless"""
+        state = State(name="Lagos")
+        city = City(state_id=state.id)
+        self.storage.new(state)
+        self.storage.new(city)
+        self.storage.save()
+        state.name = "Abuja"
+        self.storage.new(state)
+        self.storage.delete(city)
+        self.storage.save()
+        with open(self.path + ".log") as f:
+            journal = f.read()
+        self.storage.compact()
+        with open(self.path + ".log", "w") as f:
+            f.write(journal)
+        storage = self.reloaded()
+        self.assertEqual(storage.get(State, state.id).name, "Abuja")
+        self.assertIsNone(storage.get(City, city.id))
+        self.assertEqual(storage.count(), 1)
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestFileStorageWrites(ScratchFileStorageTest):
+    """Test the atomic writes and fsync policies of FileStorage"""
+
+    def test_failed_save_keeps_file(self):
+        """Test that a save failing midway leaves the old file intact"""
+        state = State(name="Lagos")
+        self.storage.new(state)
+        self.storage.save()
+        with open(self.path) as f:
+            before = f.read()
+        broken = State(name=object())
+        self.storage.new(broken)
+        with self.assertRaises(TypeError):
+            self.storage.save()
+        with open(self.path) as f:
+            self.assertEqual(f.read(), before)
+        self.assertEqual(
+            [name for name in os.listdir(".") if name.endswith(".tmp")], [])
+
+    def test_corrupt_file_is_not_ignored(self):
+        """Test that reload refuses a file it cannot parse"""
+        with open(self.path, "w") as f:
+            f.write('{"State.1": {"__cla')
+        with self.assertRaises(ValueError):
+            self.new_storage().reload()
+
+    def test_missing_file(self):
+        """Test that reload starts empty without a file"""
+        self.new_storage().reload()
+        self.assertEqual(FileStorage._FileStorage__objects, {})
+
+    def test_fsync_policies(self):
+        """Test how often each HBNB_FILE_FSYNC policy calls fsync"""
+        # every save fsyncs the file, and a synced save its directory
+        for policy, expected in (("always", 6), ("never", 0),
+                                 ("batched", 4)):
+            with self.subTest(policy=policy):
+                env = {"HBNB_FILE_FSYNC": policy,
+                       "HBNB_FILE_FSYNC_INTERVAL": "3600"}
+                with mock.patch.dict(os.environ, env):
+                    storage = self.new_storage()
+                with mock.patch("os.fsync") as fsync:
+                    for i in range(3):
+                        storage.new(State())
+                        storage.save()
+                self.assertEqual(fsync.call_count, expected)
+
+    def test_bad_fsync_policy(self):
+        """Test that an unknown HBNB_FILE_FSYNC value is rejected"""
+        with mock.patch.dict(os.environ, {"HBNB_FILE_FSYNC": "sometimes"}):
+            with self.assertRaises(ValueError):
+                FileStorage()
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestFileStorageGroupCommit(ScratchFileStorageTest):
+    """Test the group commit mode of the FileStorage class"""
+
+    env = {"HBNB_FILE_COMMIT": "group", "HBNB_FILE_COMMIT_WINDOW": "3600",
+           "HBNB_FILE_COMMIT_COUNT": "3"}
+
+    def tearDown(self):
+        """stop the pending flush timer"""
+        self.storage.flush()
+        super().tearDown()
+
+    def test_saves_are_coalesced(self):
+        """Test that saves are written once HBNB_FILE_COMMIT_COUNT is hit"""
+        with mock.patch.object(FileStorage, "compact") as compact:
+            for i in range(7):
+                self.storage.new(State())
+                self.storage.save()
+        self.assertEqual(compact.call_count, 2)
+
+    def test_flush(self):
+        """Test that flush writes the pending saves"""
+        state = State()
+        self.storage.new(state)
+        self.storage.save()
+        self.assertFalse(os.path.exists(self.path))
+        self.storage.flush()
+        self.assertIn("State." + state.id, self.reloaded().all())
+
+    def test_window(self):
+        """Test that pending saves are written when the window expires"""
+        env = dict(self.env, HBNB_FILE_COMMIT_WINDOW="0.01")
+        with mock.patch.dict(os.environ, env):
+            storage = self.new_storage()
+        storage.new(State())
+        storage.save()
+        for i in range(100):
+            if os.path.exists(self.path):
+                break
+            time.sleep(0.01)
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_flush_waiting(self):
+        """Test that flush_waiting only writes instances with pending
+        saves"""
+        self.storage.new(State())
+        self.storage.save()
+        FileStorage.flush_waiting()
+        self.assertTrue(os.path.exists(self.path))
+        os.remove(self.path)
+        FileStorage.flush_waiting()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_reload_keeps_pending_changes(self):
+        """Test that reload does not undo changes waiting to be written"""
+        state = State(name="Lagos")
+        self.storage.new(state)
+        self.storage.flush()
+        state.name = "Abuja"
+        self.storage.new(state)
+        self.storage.save()
+        self.storage.reload()
+        self.assertEqual(self.storage.get(State, state.id).name, "Abuja")
+        self.storage.flush()
+        self.assertEqual(self.reloaded().get(State, state.id).name, "Abuja")
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestFileStorageReload(ScratchFileStorageTest):
+    """Test how FileStorage rebuilds objects from the JSON file"""
+
+    def test_reload_rebuilds_objects(self):
+        """Test that reloaded objects equal the ones that were saved"""
+        user = User(email="a@b.c", password="pwd", first_name="Leo")
+        place = Place(name="Home", number_rooms=3, amenity_ids=["a"])
+        for obj in (user, place):
+            self.storage.new(obj)
+        self.storage.save()
+        storage = self.reloaded()
+        for obj in (user, place):
+            with self.subTest(obj=obj):
+                loaded = storage.get(type(obj), obj.id)
+                self.assertIsNot(loaded, obj)
+                self.assertIs(type(loaded), type(obj))
+                self.assertEqual(loaded.__dict__, obj.__dict__)
+                self.assertIs(type(loaded.created_at), datetime)
+                copy = pickle.loads(pickle.dumps(loaded))
+                self.assertIs(type(copy), type(obj))
+                self.assertEqual(copy.to_dict(), obj.to_dict())
+        loaded = storage.get(User, user.id)
+        loaded.__dict__["first_name"] = "Ada"
+        loaded.__dict__.update(last_name="Lovelace")
+        self.assertEqual(loaded.first_name, "Ada")
+        self.assertEqual(loaded.to_dict()["last_name"], "Lovelace")
+        self.assertEqual(loaded.password, user.password)
+
+    def test_reload_keeps_password_hash(self):
+        """Test that the saved password hash is not hashed again, even
+        for a record that goes through __init__"""
+        user = User(email="a@b.c", password="pwd")
+        record = user.to_dict(use_pwd=True)
+        del record["created_at"]
+        with open(self.path, "w") as f:
+            json.dump({"User." + user.id: record}, f)
+        self.assertEqual(self.reloaded().get(User, user.id).password,
+                         user.password)
+        self.storage.new(user)
+        self.storage.save()
+        self.assertEqual(self.reloaded().get(User, user.id).password,
+                         user.password)
+
+    def test_reload_shares_foreign_keys(self):
+        """Test that reloaded objects share their foreign keys"""
+        place = Place()
+        reviews = [Review(place_id=place.id, text=str(i)) for i in range(2)]
+        for review in reviews:
+            self.storage.new(review)
+        self.storage.save()
+        storage = self.reloaded()
+        first, second = (storage.get(Review, review.id)
+                         for review in reviews)
+        self.assertNotIsInstance(first, Compact)
+        self.assertIs(first.place_id, second.place_id)
+        self.assertEqual(storage.related(Review, "place_id", place.id),
+                         [first, second])
+
+    def test_reload_skips_unchanged_files(self):
+        """Test that reload does not read files it already holds"""
+        self.storage.new(State())
+        self.storage.save()
+        with mock.patch("json.load") as load:
+            self.storage.reload()
+        self.assertFalse(load.called)
+        with open(self.path, "w") as f:
+            f.write("{}")
+        with mock.patch("json.load", return_value={}) as load:
+            self.storage.reload()
+        self.assertTrue(load.called)
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestFileStorageSlotted(ScratchFileStorageTest):
+    """Test the compact objects FileStorage builds with
+    HBNB_FILE_SLOTTED=1"""
+
+    env = {"HBNB_FILE_SLOTTED": "1"}
+
+    def test_reload_builds_compact_objects(self):
+        """Test that reloaded objects are compact variants, told apart
+        from their model by their qualified name"""
+        place = Place(name="Home", number_rooms=3)
+        self.storage.new(place)
+        self.storage.save()
+        loaded = self.reloaded().get(Place, place.id)
+        self.assertIs(type(loaded), Compact.variant(Place))
+        self.assertIsNot(type(loaded), Place)
+        self.assertIsInstance(loaded, Place)
+        self.assertEqual(type(loaded).__qualname__, "CompactPlace")
+        self.assertNotEqual(repr(type(loaded)), repr(Place))
+        self.assertEqual(loaded.to_dict(), place.to_dict())
+
+    def test_dict_writes_raise(self):
+        """Test that writing to the __dict__ of a compact object raises
+        instead of being lost"""
+        state = State(name="Lagos")
+        self.storage.new(state)
+        self.storage.save()
+        loaded = self.reloaded().get(State, state.id)
+        with self.assertRaises(TypeError):
+            loaded.__dict__["name"] = "Kano"
+        with self.assertRaises(TypeError):
+            loaded.__dict__.update(name="Kano")
+        loaded.name = "Kano"
+        self.assertEqual(loaded.__dict__["name"], "Kano")
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestFileStorageLazy(ScratchFileStorageTest):
+    """Test the lazy mode of the FileStorage class"""
+
+    env = {"HBNB_FILE_LAZY": "1"}
+
+    def setUp(self):
+        """save a few related objects to the scratch file"""
+        super().setUp()
+        self.state = State(name="Lagos")
+        self.city = City(state_id=self.state.id, name="Ikeja")
+        self.amenity = Amenity(name="Wifi")
+        for obj in (self.state, self.city, self.amenity):
+            self.storage.new(obj)
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        with mock.patch.dict(os.environ, self.env):
+            self.storage = self.new_storage()
+        self.storage.reload()
+
+    def test_nothing_built_on_reload(self):
+        """Test that reload keeps objects unbuilt but counted"""
+        self.assertEqual(FileStorage._FileStorage__objects, {})
+        self.assertEqual(self.storage.count(), 3)
+        self.assertEqual(self.storage.count(City), 1)
+
+    def test_get_builds_one_object(self):
+        """Test that get builds only the object asked for"""
+        state = self.storage.get(State, self.state.id)
+        self.assertEqual(state.__dict__, self.state.__dict__)
+        self.assertIs(self.storage.get(State, self.state.id), state)
+        self.assertEqual(list(FileStorage._FileStorage__objects),
+                         ["State." + self.state.id])
+
+    def test_all_builds_the_class(self):
+        """Test that all(cls) builds that class and all() everything"""
+        cities = self.storage.all(City)
+        self.assertEqual(list(cities), ["City." + self.city.id])
+        self.assertIsInstance(cities["City." + self.city.id], City)
+        self.assertEqual(len(FileStorage._FileStorage__objects), 1)
+        self.assertEqual(len(self.storage.all()), 3)
+
+    def test_related(self):
+        """Test that related finds objects that are not built yet"""
+        cities = self.storage.related(City, "state_id", self.state.id)
+        self.assertEqual([city.id for city in cities], [self.city.id])
+
+    def test_save_keeps_unbuilt_objects(self):
+        """Test that save writes unbuilt objects back unchanged"""
+        state = self.storage.get(State, self.state.id)
+        state.name = "Abuja"
+        self.storage.new(state)
+        self.storage.save()
+        storage = self.reloaded()
+        self.assertEqual(storage.count(), 3)
+        self.assertEqual(storage.get(State, self.state.id).name, "Abuja")
+        self.assertEqual(storage.get(Amenity, self.amenity.id).name, "Wifi")
+
+    def test_delete_unbuilt_key(self):
+        """Test that a deleted object stays deleted after a reload"""
+        self.storage.delete(self.storage.get(City, self.city.id))
+        self.storage.save()
+        self.assertIsNone(self.reloaded().get(City, self.city.id))
+        self.assertEqual(self.storage.count(), 2)
+
+    def test_delete_iterated_object(self):
+        """Test that deleting an object iterate() built without keeping
+        it deletes it"""
+        city = next(self.storage.iterate(City))
+        self.assertNotIn("City." + city.id, FileStorage._FileStorage__objects)
+        self.storage.delete(city)
+        self.storage.save()
+        self.assertEqual(self.storage.count(City), 0)
+        self.assertIsNone(self.reloaded().get(City, self.city.id))
+
+    def test_places_nearby_after_reload(self):
+        """Test that a reload reading the file again keeps the places in
+        the grid of places_nearby"""
+        places = [Place(latitude=10, longitude=10 + i / 100)
+                  for i in range(3)]
+        for place in places:
+            self.storage.new(place)
+        self.storage.save()
+        self.assertCountEqual(self.storage.places_nearby(10, 10, 5),
+                              places)
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.storage.reload()
+        self.assertCountEqual([place.id for place in
+                               self.storage.places_nearby(10, 10, 5)],
+                              [place.id for place in places])
+        for place in places:
+            self.storage.delete(place)
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestFileStorageFormats(ScratchFileStorageTest):
+    """Test the file formats FileStorage can save in"""
+
+    env = {"HBNB_FILE_FORMAT": "packed"}
+
+    def test_packed_round_trip(self):
+        """Test that objects saved packed reload unchanged"""
+        user = User(email="a@b.c", password="pwd")
+        place = Place(name="Home", amenity_ids=["a", "b"], latitude=1.5)
+        place.extra = {"nested": [1, None]}
+        for obj in (user, place, State(name="Lagos")):
+            self.storage.new(obj)
+        self.storage.save()
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(len(file_storage.PackedFormat.magic)),
+                             file_storage.PackedFormat.magic)
+        storage = self.reloaded()
+        self.assertEqual(storage.count(), 3)
+        for obj in (user, place):
+            with self.subTest(obj=obj):
+                loaded = storage.get(type(obj), obj.id)
+                self.assertEqual(loaded.__dict__, obj.__dict__)
+
+    def test_packed_layout(self):
+        """Test that the packed file is a JSON header and its columns"""
+        states = [State(name="Lagos"), State(name="Kano")]
+        for state in states:
+            self.storage.new(state)
+        self.storage.save()
+        with open(self.path, "rb") as f:
+            f.read(len(file_storage.PackedFormat.magic))
+            size = struct.unpack("<Q", f.read(8))[0]
+            header = json.loads(f.read(size))
+            data = f.read()
+        self.assertEqual(len(header), 1)
+        group = header[0]
+        self.assertEqual(group["class"], "State")
+        self.assertEqual(group["rows"], 2)
+        self.assertEqual(sorted(group["stamped"]),
+                         ["created_at", "updated_at"])
+        self.assertEqual(sum(group["lengths"]), len(data))
+        at = 0
+        for attr, length in zip(group["attrs"], group["lengths"]):
+            blob = data[at:at + length]
+            at += length
+            if attr == "name":
+                self.assertEqual(json.loads(blob), ["Lagos", "Kano"])
+            elif attr == "created_at":
+                micros = struct.unpack("<2q", blob)
+                self.assertEqual(micros[1], file_storage.PackedFormat.micros(
+                    states[1].created_at))
+
+    def test_json_reads_packed(self):
+        """Test that a storage saving JSON reloads a packed file"""
+        state = State(name="Lagos")
+        self.storage.new(state)
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        with mock.patch.dict(os.environ, {"HBNB_FILE_LAZY": "1"}):
+            storage = self.new_storage()
+        storage.reload()
+        storage.save()
+        with open(self.path) as f:
+            saved = json.load(f)
+        self.assertEqual(saved["State." + state.id], state.to_dict())
+
+    def test_bad_format(self):
+        """Test that an unknown HBNB_FILE_FORMAT value is rejected"""
+        with mock.patch.dict(os.environ, {"HBNB_FILE_FORMAT": "xml"}):
+            with self.assertRaises(ValueError):
+                FileStorage()
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestFileStorageRecords(ScratchFileStorageTest):
+    """Test the memory-mapped records format of the FileStorage class"""
+
+    env = {"HBNB_FILE_FORMAT": "records", "HBNB_FILE_LAZY": "1"}
+
+    def setUp(self):
+        """save a few objects as records and reload them lazily"""
+        super().setUp()
+        self.states = [State(name="State {}".format(i)) for i in range(3)]
+        self.city = City(state_id=self.states[0].id, name="Ikeja")
+        for obj in self.states + [self.city]:
+            self.storage.new(obj)
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        with mock.patch.dict(os.environ, self.env):
+            self.storage = self.new_storage()
+        self.storage.reload()
+
+    def test_records_file(self):
+        """Test that the file starts with the records header"""
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(len(file_storage.RecordsFormat.magic)),
+                             file_storage.RecordsFormat.magic)
+        self.assertEqual(self.storage.count(), 4)
+        self.assertEqual(FileStorage._FileStorage__objects, {})
+
+    def test_records_layout(self):
+        """Test that the index holds the keys and offsets of the records"""
+        with open(self.path, "rb") as f:
+            data = f.read()
+        index_at, length = struct.unpack("<QQ", data[-16:])
+        keys = json.loads(data[index_at:index_at + length])
+        offsets = struct.unpack("<{}Q".format(len(keys) + 1),
+                                data[index_at + length:-16])
+        self.assertEqual(offsets[-1], index_at)
+        key = "State." + self.states[1].id
+        i = keys.index(key)
+        self.assertEqual(json.loads(data[offsets[i]:offsets[i + 1]]),
+                         self.states[1].to_dict())
+
+    def test_get_decodes_one_record(self):
+        """Test that get decodes only the record asked for"""
+        with mock.patch("json.loads", wraps=json.loads) as loads:
+            state = self.storage.get(State, self.states[1].id)
+        self.assertEqual(loads.call_count, 1)
+        self.assertEqual(state.__dict__, self.states[1].__dict__)
+
+    def test_iterate_keeps_nothing(self):
+        """Test that iterate builds objects without keeping them"""
+        names = sorted(state.name for state in self.storage.iterate(State))
+        self.assertEqual(names, ["State 0", "State 1", "State 2"])
+        self.assertEqual(FileStorage._FileStorage__objects, {})
+        self.assertEqual(len(list(self.storage.iterate())), 4)
+
+    def test_related(self):
+        """Test that related decodes the records of the class once"""
+        cities = self.storage.related(City, "state_id", self.states[0].id)
+        self.assertEqual([city.id for city in cities], [self.city.id])
+
+    def test_save_and_reload(self):
+        """Test that unbuilt records survive a save and a change"""
+        state = self.storage.get(State, self.states[0].id)
+        state.name = "Lagos"
+        self.storage.new(state)
+        self.storage.delete(self.storage.get(City, self.city.id))
+        self.storage.save()
+        storage = self.reloaded()
+        self.assertEqual(storage.count(), 3)
+        self.assertEqual(storage.get(State, state.id).name, "Lagos")
+        self.assertEqual(storage.get(State, self.states[2].id).name,
+                         "State 2")
+
+    def test_reload_closes_replaced_file(self):
+        """Test that reloading a new file builds the records it does not
+        replace and unmaps the old file"""
+        old = FileStorage._FileStorage__raw["State." + self.states[1].id]
+        state = State(name="Kano")
+        with open(self.path + ".new", "wb") as f:
+            file_storage.RecordsFormat.dump(
+                [("State." + state.id, state.to_dict())], f)
+        os.replace(self.path + ".new", self.path)
+        with mock.patch.object(file_storage.MappedRecords, "close",
+                               autospec=True,
+                               side_effect=file_storage.MappedRecords
+                               .close) as close:
+            self.storage.reload()
+        close.assert_called_once_with(old)
+        self.assertFalse(any(source is old for source in
+                             FileStorage._FileStorage__raw.values()))
+        self.assertEqual(self.storage.get(State, self.states[1].id).name,
+                         "State 1")
+        self.assertEqual(self.storage.get(State, state.id).name, "Kano")
+        self.assertEqual(self.storage.count(), 5)
@@ -0,0 +1,92 @@
+#!/usr/bin/python3
+"""
+Contains the TestGeoDocs, TestDistance and TestGrid classes
+"""
+
+import inspect
+from models.engine import geo
+import pep8
+import unittest
+
+Grid = geo.Grid
+
+
+class TestGeoDocs(unittest.TestCase):
+    """Tests to check the documentation and style of geo.py"""
+
+    def test_pep8_conformance_geo(self):
+        """Test that models/engine/geo.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(["models/engine/geo.py",
+                                    "tests/test_models/test_engine/"
+                                    "test_geo.py"])
+        self.assertEqual(
+            result.total_errors, 0, "Found code style errors (and warnings)."
+        )
+
+    def test_geo_docstrings(self):
+        """Test for the module, function and method docstrings"""
+        self.assertTrue(len(geo.__doc__) >= 1)
+        self.assertTrue(len(Grid.__doc__) >= 1)
+        for name, func in inspect.getmembers(geo, inspect.isfunction) + \
+                inspect.getmembers(Grid, inspect.isfunction):
+            self.assertTrue(len(func.__doc__) >= 1,
+                            "{:s} needs a docstring".format(name))
+
+
+class TestDistance(unittest.TestCase):
+    """Test the distance and box helpers"""
+
+    def test_distance(self):
+        """Test distances along a meridian and across the antimeridian"""
+        self.assertAlmostEqual(geo.distance(0, 0, 1, 0), 111.195, places=2)
+        self.assertAlmostEqual(geo.distance(0, 179.5, 0, -179.5),
+                               geo.distance(0, 0, 0, 1))
+        self.assertEqual(geo.distance(12, 34, 12, 34), 0)
+
+    def test_box(self):
+        """Test the box of a circle, across the antimeridian and a pole"""
+        south, north, intervals = geo.box(0, 0, 111.195)
+        self.assertAlmostEqual(south, -1, places=3)
+        self.assertAlmostEqual(north, 1, places=3)
+        self.assertEqual(len(intervals), 1)
+        self.assertEqual(len(geo.box(0, 179.9, 100)[2]), 2)
+        self.assertEqual(geo.box(89.5, 0, 100)[2], [(-180, 180)])
+
+
+class TestGrid(unittest.TestCase):
+    """Test the Grid index"""
+
+    def setUp(self):
+        """place a few points"""
+        self.grid = Grid()
+        self.points = {"a": (0, 0), "b": (0, 0.5), "c": (0, 2),
+                       "d": (0, 179.9), "e": (0, -179.9)}
+        for key, (lat, lng) in self.points.items():
+            self.grid.add(key, lat, lng)
+
+    def test_within(self):
+        """Test that within finds the points of the circle, nearest first"""
+        found = self.grid.within(0, 0.1, 100)
+        self.assertEqual([key for distance, key in found], ["a", "b"])
+        self.assertAlmostEqual(found[0][0], geo.distance(0, 0.1, 0, 0))
+        self.assertEqual([key for distance, key in
+                          self.grid.within(0, 180, 20)], ["d", "e"])
+
+    def test_nearest(self):
+        """Test that nearest returns the k nearest points"""
+        self.assertEqual([key for distance, key in
+                          self.grid.nearest(0, 1.9, 2)], ["c", "b"])
+        self.assertEqual(len(self.grid.nearest(0, 0, 10)), 5)
+        self.assertEqual(self.grid.nearest(0, 1.9, 2, radius=20)[0][1], "c")
+        self.assertEqual(len(self.grid.nearest(0, 1.9, 2, radius=20)), 1)
+
+    def test_add_moves_and_remove(self):
+        """Test that add moves a placed key and remove forgets it"""
+        self.grid.add("c", 10, 10)
+        self.assertEqual(self.grid.within(0, 2, 1), [])
+        self.assertEqual(self.grid.within(10, 10, 1)[0][1], "c")
+        self.grid.remove("c")
+        self.grid.remove("missing")
+        self.assertEqual(self.grid.within(10, 10, 1), [])
+        self.assertEqual(len(self.grid), 4)
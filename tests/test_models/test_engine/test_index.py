@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+"""
+Contains the TestIndexDocs, TestTokens and TestTextIndex classes
+"""
+
+import inspect
+from models.engine import index
+import pep8
+import unittest
+
+TextIndex = index.TextIndex
+
+
+class TestIndexDocs(unittest.TestCase):
+    """Tests to check the documentation and style of index.py"""
+
+    def test_pep8_conformance_index(self):
+        """Test that models/engine/index.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(["models/engine/index.py",
+                                    "tests/test_models/test_engine/"
+                                    "test_index.py"])
+        self.assertEqual(
+            result.total_errors, 0, "Found code style errors (and warnings)."
+        )
+
+    def test_index_docstrings(self):
+        """Test for the module, function and method docstrings"""
+        self.assertTrue(len(index.__doc__) >= 1)
+        self.assertTrue(len(TextIndex.__doc__) >= 1)
+        for name, func in inspect.getmembers(index, inspect.isfunction) + \
+                inspect.getmembers(TextIndex, inspect.isfunction):
+            self.assertTrue(len(func.__doc__) >= 1,
+                            "{:s} needs a docstring".format(name))
+
+
+class TestTokens(unittest.TestCase):
+    """Test the tokens and text_of helpers"""
+
+    def test_tokens(self):
+        """Test that tokens lowers the words and drops the punctuation"""
+        self.assertEqual(index.tokens("Cosy, QUIET flat!"),
+                         ["cosy", "quiet", "flat"])
+        self.assertEqual(index.tokens(None), [])
+
+    def test_text_of(self):
+        """Test that text_of joins the strings only"""
+        self.assertEqual(index.text_of(["a b", None, 3, "c"]), "a b c")
+
+
+class TestTextIndex(unittest.TestCase):
+    """Test the TextIndex"""
+
+    def setUp(self):
+        """index a few texts"""
+        self.index = TextIndex()
+        self.index.add("a", "quiet flat with a garden")
+        self.index.add("b", "garden garden garden")
+        self.index.add("c", "noisy street")
+
+    def test_search(self):
+        """Test that search ranks the texts holding words of the query"""
+        found = self.index.search("Garden")
+        self.assertEqual([key for score, key in found], ["b", "a"])
+        self.assertGreater(found[0][0], found[1][0])
+        self.assertEqual([key for score, key in
+                          self.index.search("garden quiet")], ["a", "b"])
+        self.assertEqual(self.index.search("garden", 1)[0][1], "b")
+        self.assertEqual(self.index.search("missing"), [])
+        self.assertEqual(TextIndex().search("garden"), [])
+
+    def test_add_replaces_and_remove(self):
+        """Test that add replaces the text of a key and remove forgets it"""
+        self.index.add("b", "noisy garage")
+        self.assertEqual([key for score, key in
+                          self.index.search("garden")], ["a"])
+        self.index.remove("c")
+        self.index.remove("missing")
+        self.assertEqual([key for score, key in
+                          self.index.search("noisy")], ["b"])
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual(self.index.length, 7)
+        self.assertNotIn("street", self.index.postings)
@@ -7,7 +7,9 @@ from datetime import datetime
 import inspect
 import models
 from models import place
+from models.amenity import Amenity
 from models.base_model import BaseModel
+from models.review import Review
 import pep8
 import unittest
 Place = place.Place
@@ -198,3 +200,18 @@ class TestPlace(unittest.TestCase):
         place = Place()
         string = "[Place] ({}) {}".format(place.id, place.__dict__)
         self.assertEqual(string, str(place))
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing File Storage")
+    def test_reviews_and_amenities(self):
+        """Test the reviews and amenities getters in file storage"""
+        place = Place()
+        review = Review(place_id=place.id)
+        amenity = Amenity()
+        models.storage.new(review)
+        models.storage.new(amenity)
+        place.amenity_ids = [amenity.id, "missing"]
+        self.assertEqual(place.reviews, [review])
+        self.assertEqual(place.amenities, [amenity])
+        self.assertEqual(Place().amenity_ids, [])
+        models.storage.delete(review)
+        models.storage.delete(amenity)
@@ -8,6 +8,7 @@ import inspect
 import models
 from models import state
 from models.base_model import BaseModel
+from models.city import City
 import pep8
 import unittest
 State = state.State
@@ -103,3 +104,16 @@ class TestState(unittest.TestCase):
         state = State()
         string = "[State] ({}) {}".format(state.id, state.__dict__)
         self.assertEqual(string, str(state))
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing File Storage")
+    def test_cities(self):
+        """Test that cities returns the cities linked to the state"""
+        state = State()
+        city = City(state_id=state.id)
+        other = City(state_id="other")
+        models.storage.new(city)
+        models.storage.new(other)
+        self.assertEqual(state.cities, [city])
+        models.storage.delete(city)
+        models.storage.delete(other)
+        self.assertEqual(state.cities, [])